@@ -10,23 +10,77 @@
 
 """
 
+import argparse
+import contextlib
+import datetime
 import os
 import logging
 import kanilog
 from pathlib import Path
 
-from . import download_kouseimeigara_pdfs, download_josuu_pdfs, parse_pdfs
+from . import instrumentation
+from .export import FILE_FORMATS, export_daily_compositions
+from .pipeline import download_josuu_pdfs, download_kouseimeigara_pdfs, parse_pdfs
+from .store import compile_store
 
+STAGES = [
+    ("download_kouseimeigara_pdfs", download_kouseimeigara_pdfs),
+    ("download_josuu_pdfs", download_josuu_pdfs),
+    ("parse_pdfs", parse_pdfs),
+    ("compile_store", compile_store),
+]
 
-def main():
-    download_kouseimeigara_pdfs()
-    download_josuu_pdfs()
-    parse_pdfs()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m n225")
+    parser.add_argument("--report", type=Path, help="write a JSON run report to this path")
+    parser.add_argument("--prometheus", type=Path, help="write the run metrics as a textfile")
+    parser.add_argument("--profile", type=Path, help="dump cProfile stats to this path")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("refresh", help="download, parse and compile the store (default)")
+    export_parser = subparsers.add_parser("export", help="export the daily composition history")
+    export_parser.add_argument("path", type=Path, help="directory of the exported files")
+    export_parser.add_argument("--to", dest="to_date", type=datetime.date.fromisoformat)
+    export_parser.add_argument("--full", action="store_true", help="rewrite the whole history")
+    export_parser.add_argument(
+        "--format", dest="file_format", choices=FILE_FORMATS, default="parquet"
+    )
+    args = parser.parse_args(argv)
+    for name in ("report", "prometheus", "profile", "path"):
+        if getattr(args, name, None) is not None:
+            setattr(args, name, getattr(args, name).resolve())
+    return args
+
+
+def export(args):
+    export_daily_compositions(args.path, args.to_date, args.full, args.file_format)
+
+
+def main(args=None):
+    if args is None:
+        args = parse_args([])
+    report = instrumentation.start_run()
+    with contextlib.ExitStack() as stack:
+        if args.profile is not None:
+            stack.enter_context(instrumentation.profile(args.profile))
+        if args.command == "export":
+            with report.stage("export"):
+                export(args)
+        else:
+            for name, stage in STAGES:
+                with report.stage(name):
+                    stage()
+    if args.report is not None:
+        report.write_json(args.report)
+    if args.prometheus is not None:
+        report.write_prometheus(args.prometheus)
+    return report
 
 
 if __name__ == "__main__":
+    args = parse_args()
     os.chdir(Path(__file__).parent)
     kanilog.setup_logger(
         logfile="/tmp/%s.log" % (Path(__file__).name), level=logging.INFO
     )
-    main()
+    main(args)
@@ -0,0 +1,37 @@
+"""Vectorized n225 index calculation over price panels."""
+import numpy as np
+import pandas as pd
+
+from .index import calculate_indices
+from .timeline import normalize_code
+from .weights import get_weight_table
+
+
+def calculate_n225_series(price_df):
+    """Calculate the index for every row of ``price_df``.
+
+    ``price_df`` is indexed by timestamps and has one column per stock code.
+    Weights switch at every composition change date.
+    """
+    return calculate_indices(price_df, [get_weight_table()])["n225"]
+
+
+def calculate_n225_contributions(price_df):
+    """Per stock terms ``price * 50 / minashi / josuu`` for every row of ``price_df``.
+
+    Columns are the stock codes that are a member in the period of any row,
+    with zero where a stock is not a member. Each row sums to the index.
+    """
+    table = get_weight_table()
+    price_df = price_df.rename(columns=normalize_code)
+    periods = table.periods_of(price_df.index)
+    members = np.asarray(table.members)[periods]
+    columns = np.flatnonzero(members.any(axis=0))
+    stock_codes = [table.stock_codes[i] for i in columns]
+    missing = set(stock_codes).difference(price_df.columns)
+    if missing:
+        raise KeyError(f"Missing prices for {sorted(missing)}")
+    prices = price_df[stock_codes].to_numpy(dtype=np.float64)
+    weights = np.asarray(table.weights)[np.ix_(periods, columns)]
+    contributions = np.where(members[:, columns], prices * weights, 0.0)
+    return pd.DataFrame(contributions, index=price_df.index, columns=stock_codes)
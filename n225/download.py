@@ -0,0 +1,333 @@
+"""Incremental PDF downloads from the Nikkei newsroom."""
+import hashlib
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import kanilog
+from kanirequests import KaniRequests
+from requests_html import HTML
+from urlpath import URL
+
+from . import instrumentation
+from .timeline import file_lock, replace_file
+
+logger = kanilog.get_module_logger(__file__, 1)
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:85.0) Gecko/20100101 Firefox/85.0",
+    "Accept-Language": "ja,en-US;q=0.7,en;q=0.3",
+    "Connection": "keep-alive",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Cache-Control": "max-age=0",
+}
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter(object):
+    """Token bucket allowing ``rate`` requests per second with ``burst`` tokens."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Fetcher(object):
+    """Shared download engine for the newsroom listings and PDFs.
+
+    Requests go through one session so connections are reused, are spaced by
+    a ``RateLimiter`` and are retried with exponential backoff on errors and
+    retryable status codes. ``get_many`` fetches through a bounded thread pool.
+    """
+
+    def __init__(self, session=None, max_workers=4, rate=2.0, burst=2, retries=3, backoff=1.0):
+        if session is None:
+            session = KaniRequests(headers=HEADERS)
+        self.session = session
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(rate, burst) if rate else None
+        self.retries = retries
+        self.backoff = backoff
+
+    def get(self, url, **kwargs):
+        for attempt in range(self.retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, **kwargs)
+            except Exception as e:
+                instrumentation.count("request_errors")
+                if attempt == self.retries:
+                    raise
+                logger.warning("Retrying %s after %s", url, e)
+            else:
+                size = len(response.content)
+                instrumentation.count("requests")
+                instrumentation.count("bytes_downloaded", size)
+                instrumentation.record_file(
+                    "fetch",
+                    str(url),
+                    time.perf_counter() - start,
+                    status_code=response.status_code,
+                    bytes=size,
+                )
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.retries:
+                    return response
+                logger.warning("Retrying %s after status %s", url, response.status_code)
+            instrumentation.count("retries")
+            time.sleep(self.backoff * 2 ** attempt)
+
+    def _get_or_none(self, url):
+        try:
+            return self.get(url)
+        except Exception:
+            logger.exception("Failed to get %s", url)
+            return None
+
+    def get_many(self, urls):
+        """Fetch ``urls`` concurrently. Failed requests give ``None``."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(self._get_or_none, urls))
+
+
+class DownloadManifest(object):
+    """JSON manifest of fetched listing pages and PDFs keyed by URL.
+
+    PDF entries hold ``file``, ``sha256`` and ``parsed``, or ``pending`` and the
+    ``listing`` they were linked from while they could not be downloaded.
+    Every entry keeps the ``etag`` and ``last_modified`` validators of its last
+    response so listing pages can be requested conditionally. Writers load,
+    update and save it under ``lock``.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.load()
+
+    def lock(self):
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        return file_lock(self.lock_path)
+
+    def load(self):
+        self.entries = {}
+        if self.path.exists():
+            self.entries = json.loads(self.path.read_text())
+
+    def __contains__(self, url):
+        return url in self.entries
+
+    def get(self, url):
+        return self.entries.get(url, {})
+
+    def conditional_headers(self, url):
+        entry = self.get(url)
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record(self, url, response=None, **fields):
+        entry = self.entries.setdefault(url, {})
+        if response is not None:
+            entry["etag"] = response.headers.get("ETag")
+            entry["last_modified"] = response.headers.get("Last-Modified")
+        entry.update(fields)
+        return entry
+
+    def record_pdf(self, url, file_name, content, response=None):
+        entry = self.record(
+            url,
+            response,
+            file=file_name,
+            sha256=hashlib.sha256(content).hexdigest(),
+            parsed=None,
+        )
+        entry.pop("pending", None)
+        return entry
+
+    def record_pending(self, url, file_name, listing_url):
+        return self.record(url, file=file_name, listing=listing_url, pending=True)
+
+    def pending_pdfs(self, listing_url):
+        return [
+            (url, entry["file"])
+            for url, entry in sorted(self.entries.items())
+            if entry.get("pending") and entry.get("listing") == listing_url
+        ]
+
+    def mark_parsed(self, file_name, parsed):
+        for entry in self.entries.values():
+            if entry.get("file") == file_name:
+                entry["parsed"] = parsed
+
+    def save(self):
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        replace_file(
+            self.path,
+            lambda f: json.dump(self.entries, f, ensure_ascii=False, indent=1, sort_keys=True),
+        )
+
+
+class FixtureResponse(object):
+    def __init__(self, url, content, status_code=200):
+        self.url = url
+        self.content = content
+        self.status_code = status_code
+        self.headers = {}
+
+    @property
+    def html(self):
+        return HTML(html=self.content.decode("utf-8"), url=self.url)
+
+
+class FixtureSession(object):
+    """Replays saved responses from ``fixture_path`` instead of the network.
+
+    A URL is looked up as the file named by ``fixture_name``. Unknown URLs
+    answer 404 with an empty body.
+    """
+
+    def __init__(self, fixture_path):
+        self.fixture_path = Path(fixture_path)
+
+    def get(self, url, *args, **kwargs):
+        url = str(url)
+        file_path = self.fixture_path / fixture_name(url)
+        if not file_path.exists():
+            return FixtureResponse(url, b"", 404)
+        return FixtureResponse(url, file_path.read_bytes())
+
+
+def fixture_name(url):
+    url = URL(str(url))
+    name = re.sub(r"[^0-9A-Za-z.]+", "_", url.path.strip("/") + "_" + url.query).strip("_")
+    if not name.endswith(".pdf"):
+        name += ".html"
+    return name
+
+
+def iter_listing_links(result, keyword):
+    for row in result.html.find("div.row"):
+        for a in row.find("a"):
+            if keyword in a.text and "pdf" in a.attrs["href"]:
+                date_text = row.find("div.list-text")[0].text.replace(".", "-")
+                yield date_text, a.text, a.attrs["href"]
+
+
+def _fetch_pdfs(fetcher, pending, listing_url, pdf_path, manifest, failed):
+    """Fetch ``pending`` pairs of URL and file name concurrently.
+
+    The URLs that could not be downloaded are recorded as pending in
+    ``manifest`` and added to ``failed``. Returns the number of written files.
+    """
+    downloaded = 0
+    responses = fetcher.get_many([pdf_url for pdf_url, _ in pending])
+    for (pdf_url, file_name), response in zip(pending, responses):
+        if response is None or response.status_code != 200:
+            if response is not None:
+                logger.warning("Got status %s from %s", response.status_code, pdf_url)
+            manifest.record_pending(pdf_url, file_name, listing_url)
+            failed.add(pdf_url)
+            continue
+        replace_file(pdf_path / file_name, lambda f: f.write(response.content), "wb")
+        manifest.record_pdf(pdf_url, file_name, response.content, response)
+        instrumentation.count("pdfs_downloaded")
+        downloaded += 1
+    return downloaded
+
+
+def download_listing_pdfs(fetcher, listing_url, keyword, pdf_path, manifest, stop_at_known=True):
+    """Download PDFs linked from the pages of ``listing_url`` into ``pdf_path``.
+
+    ``listing_url`` is formatted with ``page``. PDFs left pending in
+    ``manifest`` by an earlier run are retried first. Pages are then walked
+    newest first until the first entry that is already downloaded, or without
+    ``stop_at_known`` until a page has no matching entries, which backfills
+    any holes. The new PDFs of a page are fetched concurrently by
+    ``fetcher``, and the validators of the page are only kept once all of
+    them are written. Returns the number of downloaded files.
+    """
+    downloaded = 0
+    failed = set()
+    retry = manifest.pending_pdfs(listing_url)
+    if retry:
+        logger.info("Retrying %s pending files.", len(retry))
+        downloaded += _fetch_pdfs(fetcher, retry, listing_url, pdf_path, manifest, failed)
+        manifest.save()
+    idx = 1
+    while True:
+        is_found = False
+        is_known = False
+        is_complete = True
+        url = listing_url.format(page=idx)
+        logger.info("Opening %s", url)
+        headers = manifest.conditional_headers(url) if stop_at_known else {}
+        result = fetcher.get(url, headers=headers)
+        if result.status_code == 304:
+            logger.info("Not modified.")
+            instrumentation.count("pages_not_modified")
+            break
+        if result.status_code != 200:
+            logger.warning("Got status %s from %s", result.status_code, url)
+            break
+        instrumentation.count("pages_fetched")
+        root_path = URL(result.url)
+        pending = []
+        for date_text, title, href in iter_listing_links(result, keyword):
+            file_name = "%s_%s.pdf" % (date_text, title)
+            pdf_file_path = pdf_path / file_name
+            pdf_url = str(root_path.joinpath(href))
+            is_found = True
+            if pdf_url in failed:
+                # Already retried in this run.
+                is_complete = False
+                continue
+            if pdf_file_path.exists():
+                if pdf_url not in manifest:
+                    manifest.record_pdf(pdf_url, file_name, pdf_file_path.read_bytes())
+                if stop_at_known:
+                    is_known = True
+                    break
+                continue
+            pending.append((pdf_url, file_name))
+
+        logger.info("Downloading %s files.", len(pending))
+        written = _fetch_pdfs(fetcher, pending, listing_url, pdf_path, manifest, failed)
+        downloaded += written
+        if is_complete and written == len(pending):
+            manifest.record(url, result)
+        else:
+            # Fetched in full next time so that the page is walked again.
+            manifest.record(url, etag=None, last_modified=None)
+        manifest.save()
+        if is_known:
+            logger.info("Reached a known entry.")
+            break
+        if not is_found:
+            break
+        logger.info("Go next page.")
+        idx += 1
+    return downloaded
@@ -0,0 +1,107 @@
+"""Streaming index engine with constant time updates per tick."""
+import datetime
+import math
+
+import numpy as np
+
+from .weights import get_weight_table
+
+
+class N225Engine(object):
+    """Keeps the index up to date from a live tick feed.
+
+    Last prices are held in a NumPy array indexed like ``stock_codes`` of the
+    weight table, and the running sum of ``price * 50 / minashi / josuu`` over
+    the members is adjusted by the weighted price change of each tick. The
+    weights roll over when ``advance`` or a tick with a ``date`` reaches the
+    next composition change date. ``value`` is ``nan`` until every member has a
+    price.
+    """
+
+    def __init__(self, date, prices=None, resync_interval=100000):
+        self.table = get_weight_table()
+        self.code_index = dict(self.table.code_index)
+        for stock_code, i in self.table.code_index.items():
+            if stock_code.isdigit():
+                self.code_index[int(stock_code)] = i
+        self.prices = np.full(len(self.table.stock_codes), np.nan)
+        self.resync_interval = resync_interval
+        self._set_period(self.table.period_of(_to_date(date)))
+        if prices is not None:
+            self.on_ticks(list(prices.keys()), list(prices.values()))
+
+    def _set_period(self, period):
+        self.period = period
+        self.date = self.table.dates[period]
+        self.weights = np.asarray(self.table.weights[period])
+        self._member_indices = self.table.member_indices[period]
+        if period + 1 < len(self.table.dates):
+            self.next_change_date = self.table.dates[period + 1]
+        else:
+            self.next_change_date = None
+        self.resync()
+
+    def resync(self):
+        """Recompute the running sum from scratch to drop accumulated rounding."""
+        member_prices = self.prices[self._member_indices]
+        self._missing = int(np.isnan(member_prices).sum())
+        self._sum = float(np.nansum(member_prices * self.weights[self._member_indices]))
+        self._ticks = 0
+
+    def advance(self, date):
+        """Switch to the composition effective on ``date`` when it changed."""
+        date = _to_date(date)
+        if self.next_change_date is not None and date >= self.next_change_date:
+            self._set_period(self.table.period_of(date))
+
+    @property
+    def value(self):
+        if self._missing:
+            return math.nan
+        return self._sum
+
+    def on_tick(self, code, price, date=None):
+        if date is not None:
+            self.advance(date)
+        i = self.code_index[code]
+        weight = self.weights[i]
+        old_price = self.prices[i]
+        self.prices[i] = price
+        if weight:
+            if old_price != old_price:
+                self._missing -= 1
+                self._sum += weight * price
+            else:
+                self._sum += weight * (price - old_price)
+            self._ticks += 1
+            if self._ticks >= self.resync_interval:
+                self.resync()
+        return self.value
+
+    def on_ticks(self, codes, prices, date=None):
+        """Apply a batch of ticks. The last tick of a code in the batch wins."""
+        if date is not None:
+            self.advance(date)
+        indices = np.fromiter((self.code_index[code] for code in codes), dtype=np.intp)
+        prices = np.asarray(prices, dtype=np.float64)
+        _, last = np.unique(indices[::-1], return_index=True)
+        last = len(indices) - 1 - last
+        indices = indices[last]
+        prices = prices[last]
+
+        weights = self.weights[indices]
+        old_prices = self.prices[indices]
+        self.prices[indices] = prices
+        is_new = np.isnan(old_prices) & (weights != 0)
+        self._missing -= int(is_new.sum())
+        self._sum += float(np.dot(weights, prices - np.where(np.isnan(old_prices), 0.0, old_prices)))
+        self._ticks += len(indices)
+        if self._ticks >= self.resync_interval:
+            self.resync()
+        return self.value
+
+
+def _to_date(date):
+    if isinstance(date, datetime.datetime):
+        return date.date()
+    return date
@@ -0,0 +1,90 @@
+"""Columnar export of the daily composition history.
+
+The export is a directory of Parquet or Arrow IPC files, one per run, named
+after the first and last date they hold. Spark and Polars read the directory
+as one dataset, and an incremental run only writes the trading days after the
+last exported one. Writing needs pyarrow.
+"""
+import datetime
+import re
+from pathlib import Path
+
+import kanilog
+import numpy as np
+
+from .membership import get_daily_compositions
+from .timeline import replace_file
+
+logger = kanilog.get_module_logger(__file__, 1)
+
+FILE_FORMATS = ("parquet", "arrow")
+_PART_PATTERN = re.compile(r"^n225_(\d{8})_(\d{8})\.(parquet|arrow)$")
+
+
+def _parts(path):
+    for part in sorted(Path(path).glob("n225_*")):
+        match = _PART_PATTERN.match(part.name)
+        if match is not None:
+            yield part, datetime.datetime.strptime(match.group(2), "%Y%m%d").date()
+
+
+def get_last_exported_date(path):
+    """Last date in the export at ``path``, ``None`` if there is none."""
+    return max((last_date for _, last_date in _parts(path)), default=None)
+
+
+def _to_arrow(compositions):
+    import pyarrow as pa
+
+    return pa.table(
+        {
+            "date": pa.array(compositions["date"].to_numpy().astype("datetime64[D]")),
+            "code": pa.array(compositions["code"].tolist(), type=pa.string()),
+            "minashi": pa.array(compositions["minashi"].to_numpy(dtype=np.float64)),
+            "weight": pa.array(compositions["weight"].to_numpy(dtype=np.float64)),
+            "josuu": pa.array(compositions["josuu"].to_numpy(dtype=np.float64)),
+        }
+    )
+
+
+def _write(table, path, file_format):
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, path)
+    else:
+        import pyarrow.feather as feather
+
+        feather.write_feather(table, path)
+
+
+def export_daily_compositions(path, to_date=None, full=False, file_format="parquet"):
+    """Write the trading days not yet exported to the directory ``path``.
+
+    With ``full`` the existing files are removed and the whole history since
+    the first composition is written again, e.g. after a past change was
+    corrected. Returns the written file, or ``None`` when up to date.
+    """
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"file_format must be one of {FILE_FORMATS}.")
+    path = Path(path)
+    path.mkdir(exist_ok=True, parents=True)
+    if full:
+        for part, _ in list(_parts(path)):
+            part.unlink()
+    last_date = get_last_exported_date(path)
+    from_date = None if last_date is None else last_date + datetime.timedelta(days=1)
+    if from_date is not None and to_date is not None and from_date > to_date:
+        return None
+    compositions = get_daily_compositions(from_date, to_date)
+    if compositions.empty:
+        logger.info("Export at %s is up to date.", path)
+        return None
+
+    table = _to_arrow(compositions)
+    first_day = compositions["date"].iloc[0]
+    last_day = compositions["date"].iloc[-1]
+    file_path = path / f"n225_{first_day:%Y%m%d}_{last_day:%Y%m%d}.{file_format}"
+    replace_file(file_path, lambda f: _write(table, f, file_format), "wb")
+    logger.info("Exported %s rows to %s", len(compositions), file_path)
+    return file_path
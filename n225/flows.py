@@ -0,0 +1,48 @@
+"""Index fund rebalance flows at every composition change."""
+import numpy as np
+import pandas as pd
+
+from .timeline import normalize_code
+from .weights import get_weight_table
+
+
+def get_rebalance_flows(aum=None, price_df=None):
+    """Weight changes of every stock at every change date, one row each.
+
+    The weight is ``50 / minashi / josuu`` and zero while not a member, so a
+    fund holding the index needs ``aum / index_value * weight_delta`` more
+    shares. With ``aum``, a number or a Series by change date, and
+    ``price_df``, daily prices indexed by date with one column per stock
+    code, the ``index_value`` on the trading day before each change gives the
+    ``shares`` and the ``notional`` of the flows. Missing prices give
+    ``nan``.
+    """
+    table = get_weight_table()
+    weights = np.asarray(table.weights)
+    before, after = weights[:-1], weights[1:]
+    periods, columns = np.nonzero(before != after)
+    dates = pd.DatetimeIndex(table.dates[1:])
+    flows = pd.DataFrame(
+        {
+            "date": dates[periods],
+            "code": np.asarray(table.stock_codes, dtype=object)[columns],
+            "weight_before": before[periods, columns],
+            "weight_after": after[periods, columns],
+            "weight_delta": after[periods, columns] - before[periods, columns],
+        }
+    )
+    if aum is None or price_df is None:
+        return flows
+
+    price_df = price_df.rename(columns=normalize_code).reindex(columns=table.stock_codes)
+    rows = np.searchsorted(price_df.index, dates, side="left") - 1
+    prices = np.full((len(dates), len(table.stock_codes)), np.nan)
+    prices[rows >= 0] = price_df.to_numpy(dtype=np.float64)[rows[rows >= 0]]
+    index_values = np.sum(np.where(before != 0, prices * before, 0.0), axis=1)
+    if isinstance(aum, pd.Series):
+        aum = aum.reindex(dates).to_numpy(dtype=np.float64)
+    else:
+        aum = np.full(len(dates), float(aum))
+    flows["shares"] = (aum / index_values)[periods] * flows["weight_delta"].to_numpy()
+    flows["notional"] = flows["shares"] * prices[periods, columns]
+    return flows
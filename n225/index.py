@@ -0,0 +1,122 @@
+"""Generic index definitions and a single pass calculation of several indices."""
+import bisect
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from .jpx import to_day_array
+from .timeline import normalize_code
+
+
+class IndexDefinition(object):
+    """Constituents, weight rule and divisor history of one index.
+
+    Rows follow the change ``dates`` and columns follow ``stock_codes``. In
+    each period the index is ``sum(price * multiplier) / divisor`` over the
+    members, so ``weights`` hold ``multiplier / divisor`` and zero for the
+    stocks that are not a member. Build one with ``price_weighted`` or
+    ``cap_weighted``. ``WeightTable`` is the instance for the n225.
+    """
+
+    name = None
+    constituent_count = None
+
+    def __init__(self, name, dates, stock_codes, multipliers, divisors, constituent_count=None):
+        self.name = name
+        self.constituent_count = constituent_count
+        self.dates = list(dates)
+        self.stock_codes = list(stock_codes)
+        multipliers = np.asarray(multipliers, dtype=np.float64)
+        self.divisors = np.asarray(divisors, dtype=np.float64)
+        if multipliers.shape != (len(self.dates), len(self.stock_codes)):
+            raise ValueError(f"{name} multipliers have shape {multipliers.shape}.")
+        if self.divisors.shape != (len(self.dates),):
+            raise ValueError(f"{name} divisors have shape {self.divisors.shape}.")
+        self.members = ~np.isnan(multipliers)
+        if constituent_count is not None:
+            counts = self.members.sum(axis=1)
+            for date, count in zip(self.dates, counts):
+                if count != constituent_count:
+                    raise ValueError(f"{name} has {count} stocks on {date}.")
+        self.weights = np.where(self.members, multipliers, 0.0) / self.divisors[:, None]
+        self._index_members()
+
+    @classmethod
+    def price_weighted(cls, name, dates, stock_codes, minashi, divisors, par=50, **kwargs):
+        """Index of prices adjusted to ``par`` by the per stock ``minashi``.
+
+        ``minashi`` is ``nan`` where a stock is not a member.
+        """
+        return cls(name, dates, stock_codes, par / np.asarray(minashi), divisors, **kwargs)
+
+    @classmethod
+    def cap_weighted(cls, name, dates, stock_codes, shares, divisors, **kwargs):
+        """Market value index like TOPIX.
+
+        ``shares`` are the float adjusted shares counted, ``nan`` where a stock
+        is not a member, and each divisor is the base market value over the
+        base level.
+        """
+        return cls(name, dates, stock_codes, shares, divisors, **kwargs)
+
+    def _index_members(self):
+        self.code_index = {code: i for i, code in enumerate(self.stock_codes)}
+        self.member_indices = [np.flatnonzero(row) for row in self.members]
+        self._member_codes = [[self.stock_codes[i] for i in row] for row in self.member_indices]
+
+    def period_of(self, date):
+        if isinstance(date, datetime.datetime):
+            date = date.date()
+        if date < self.dates[0]:
+            raise NotImplementedError(f"Not implemnted {self.name} list before {self.dates[0]}")
+        return bisect.bisect_right(self.dates, date) - 1
+
+    def periods_of(self, timestamps):
+        """Vectorized ``period_of`` for an array or ``DatetimeIndex`` of timestamps."""
+        days = to_day_array(timestamps)
+        change_dates = np.array(self.dates, dtype="datetime64[D]")
+        if len(days) and days.min() < change_dates[0]:
+            raise NotImplementedError(f"Not implemnted {self.name} list before {self.dates[0]}")
+        return np.searchsorted(change_dates, days, side="right") - 1
+
+    def member_codes(self, period):
+        return self._member_codes[period]
+
+
+def calculate_indices(price_df, definitions):
+    """Calculate every index of ``definitions`` for every row of ``price_df``.
+
+    ``price_df`` is indexed by timestamps and has one column per stock code.
+    Rows sharing the same period in every definition are computed with one
+    product of their prices and the stacked weights, so the panel is read
+    once however many indices there are. Returns one column per ``name``.
+    """
+    price_df = price_df.rename(columns=normalize_code)
+    periods = np.stack([definition.periods_of(price_df.index) for definition in definitions], axis=1)
+    values = np.full(periods.shape, np.nan)
+    combinations, inverse = np.unique(periods, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    for i, combination in enumerate(combinations):
+        rows = inverse == i
+        stock_codes = sorted(
+            set().union(
+                *(
+                    definition.member_codes(period)
+                    for definition, period in zip(definitions, combination)
+                )
+            )
+        )
+        missing = set(stock_codes).difference(price_df.columns)
+        if missing:
+            raise KeyError(f"Missing prices for {sorted(missing)}")
+        column_index = {code: j for j, code in enumerate(stock_codes)}
+        weights = np.zeros((len(stock_codes), len(definitions)))
+        for k, (definition, period) in enumerate(zip(definitions, combination)):
+            columns = [column_index[code] for code in definition.member_codes(period)]
+            weights[columns, k] = definition.weights[period, definition.member_indices[period]]
+        prices = price_df.loc[rows, stock_codes].to_numpy(dtype=np.float64)
+        values[rows] = prices @ weights
+    return pd.DataFrame(
+        values, index=price_df.index, columns=[definition.name for definition in definitions]
+    )
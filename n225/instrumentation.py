@@ -0,0 +1,120 @@
+"""Timers and counters of a download, parse and compile run.
+
+The pipeline reports into the module level ``RunReport``, which ``start_run``
+replaces. Stages and files are timed with ``time.perf_counter``, counters
+are plain integers, and the report is written as JSON or as a Prometheus
+textfile for the node exporter.
+"""
+import collections
+import contextlib
+import datetime
+import json
+import re
+import threading
+import time
+from pathlib import Path
+
+from .timeline import replace_file
+
+
+class RunReport(object):
+    def __init__(self):
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self._start = time.perf_counter()
+        self.stages = collections.OrderedDict()
+        self.files = []
+        self.counters = collections.Counter()
+        self._lock = threading.Lock()
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def record_file(self, stage, name, seconds, **fields):
+        with self._lock:
+            self.files.append(dict(stage=stage, name=name, seconds=seconds, **fields))
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "started_at": self.started_at.isoformat(),
+                "seconds": time.perf_counter() - self._start,
+                "stages": dict(self.stages),
+                "counters": dict(self.counters),
+                "files": list(self.files),
+            }
+
+    def write_json(self, path):
+        _write_atomic(path, json.dumps(self.to_dict(), ensure_ascii=False, indent=1) + "\n")
+
+    def write_prometheus(self, path, prefix="n225"):
+        report = self.to_dict()
+        lines = [
+            f"# TYPE {prefix}_run_seconds gauge",
+            f"{prefix}_run_seconds {report['seconds']}",
+            f"# TYPE {prefix}_run_timestamp_seconds gauge",
+            f"{prefix}_run_timestamp_seconds {self.started_at.timestamp()}",
+            f"# TYPE {prefix}_stage_seconds gauge",
+        ]
+        for stage, seconds in report["stages"].items():
+            lines.append(f'{prefix}_stage_seconds{{stage="{stage}"}} {seconds}')
+        for name, value in sorted(report["counters"].items()):
+            metric = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+        _write_atomic(path, "\n".join(lines) + "\n")
+
+
+def _write_atomic(path, text):
+    path = Path(path)
+    path.parent.mkdir(exist_ok=True, parents=True)
+    replace_file(path, lambda f: f.write(text))
+
+
+_report = RunReport()
+
+
+def get_report():
+    return _report
+
+
+def start_run():
+    """Start a new report that the following pipeline calls report into."""
+    global _report
+    _report = RunReport()
+    return _report
+
+
+def count(name, value=1):
+    _report.count(name, value)
+
+
+def stage(name):
+    return _report.stage(name)
+
+
+def record_file(stage, name, seconds, **fields):
+    _report.record_file(stage, name, seconds, **fields)
+
+
+@contextlib.contextmanager
+def profile(path):
+    """Profile the block with cProfile and dump the stats to ``path``."""
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(str(path))
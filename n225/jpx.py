@@ -1,7 +1,10 @@
 import datetime
+import functools
+import itertools
+import os
+import threading
 from datetime import timedelta
 
-import dateutil.parser
 import jpholiday
 
 
@@ -35,86 +38,447 @@ class Omisoka(jpholiday.registry.OriginalHoliday):
         return "大晦日"
 
 
-def is_market_open(date):
-    if jpholiday.is_holiday(date):
-        return False
+def _is_market_open(date):
     if date.weekday() >= 5:
         return False
+    if jpholiday.is_holiday(date):
+        return False
     return True
 
 
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+# Years that ``get_calendar().days`` covers at least. Other years are added
+# when they are first used.
+CALENDAR_FROM_YEAR = int(os.environ.get("N225_CALENDAR_FROM_YEAR", "2000"))
+CALENDAR_TO_YEAR = os.environ.get("N225_CALENDAR_TO_YEAR")
+CALENDAR_TO_YEAR = int(CALENDAR_TO_YEAR) if CALENDAR_TO_YEAR else None
+
+
+def _to_ordinal(day):
+    return int(day.astype("int64")) + _EPOCH_ORDINAL
+
+
+def _year_open_days(year):
+    """One byte per day of ``year``, 1 on trading days."""
+    first_ordinal = datetime.date(year, 1, 1).toordinal()
+    last_ordinal = datetime.date(year, 12, 31).toordinal()
+    return bytes(
+        _is_market_open(datetime.date.fromordinal(ordinal))
+        for ordinal in range(first_ordinal, last_ordinal + 1)
+    )
+
+
+class _CalendarState(object):
+    """Trading days from ``from_year`` to ``to_year``, never modified once built.
+
+    ``ordinals`` holds the trading days as sorted date ordinals.
+    ``open_days[i]`` tells whether ``first_ordinal + i`` is a trading day and
+    ``counts[i]`` is the number of trading days up to and including
+    ``first_ordinal + i``. ``base`` is the count before ``origin_year``, so
+    counts less ``base`` do not change when earlier years are added.
+    """
+
+    def __init__(self, from_year, to_year, year_open_days, origin_year):
+        self.from_year = from_year
+        self.to_year = to_year
+        self.first_ordinal = datetime.date(from_year, 1, 1).toordinal()
+        self.last_ordinal = datetime.date(to_year, 12, 31).toordinal()
+        self.open_days = b"".join(year_open_days[year] for year in range(from_year, to_year + 1))
+        self.counts = tuple(itertools.accumulate(self.open_days))
+        self.ordinals = tuple(
+            self.first_ordinal + i for i, is_open in enumerate(self.open_days) if is_open
+        )
+        origin_ordinal = datetime.date(origin_year, 1, 1).toordinal()
+        self.base = self.count(origin_ordinal - 1) if origin_ordinal > self.first_ordinal else 0
+        self._days = None
+
+    def covers(self, from_ordinal, to_ordinal):
+        return self.first_ordinal <= from_ordinal and to_ordinal <= self.last_ordinal
+
+    def count(self, ordinal):
+        return self.counts[ordinal - self.first_ordinal]
+
+    def is_open(self, ordinal):
+        return self.open_days[ordinal - self.first_ordinal] == 1
+
+    @property
+    def days(self):
+        # Derived from ``ordinals`` only, so building it twice is harmless.
+        if self._days is None:
+            import numpy as np
+
+            days = np.array(self.ordinals, dtype=np.int64) - _EPOCH_ORDINAL
+            self._days = days.astype("datetime64[D]")
+        return self._days
+
+
+class TradingCalendar(object):
+    """Trading days built a year at a time when they are first used.
+
+    ``ordinals`` holds the trading days from ``from_year`` to ``to_year`` as
+    sorted date ordinals and ``days`` the same days as a ``datetime64[D]``
+    array, so business-day arithmetic is a couple of list lookups. The range
+    grows on demand by building only the missing years and swapping a new
+    ``_CalendarState`` in whole. Every method reads one state, so it never
+    mixes the arrays of two builds.
+    """
+
+    def __init__(self, from_year=None, to_year=None):
+        if from_year is None:
+            from_year = CALENDAR_FROM_YEAR
+        if to_year is None:
+            to_year = CALENDAR_TO_YEAR
+        if to_year is None:
+            to_year = datetime.date.today().year + 2
+        self.from_year = from_year
+        self.to_year = to_year
+        self._lock = threading.Lock()
+        self._year_open_days = {}
+        self._origin_year = None
+        self._state = None
+
+    def _full_state(self):
+        return self._ensure(
+            datetime.date(self.from_year, 1, 1).toordinal(),
+            datetime.date(self.to_year, 12, 31).toordinal(),
+        )
+
+    @property
+    def ordinals(self):
+        return self._full_state().ordinals
+
+    @property
+    def days(self):
+        return self._full_state().days
+
+    @property
+    def open_days(self):
+        import numpy as np
+
+        return np.frombuffer(self._full_state().open_days, dtype=np.bool_)
+
+    def _year(self, year):
+        """Open days of ``year``, built on first use. Called under ``_lock``."""
+        open_days = self._year_open_days.get(year)
+        if open_days is None:
+            open_days = self._year_open_days[year] = _year_open_days(year)
+        return open_days
+
+    def _ensure(self, from_ordinal, to_ordinal):
+        """A state covering ``[from_ordinal, to_ordinal]``."""
+        state = self._state
+        if state is not None and state.covers(from_ordinal, to_ordinal):
+            return state
+        with self._lock:
+            state = self._state
+            if state is None or not state.covers(from_ordinal, to_ordinal):
+                from_year = datetime.date.fromordinal(from_ordinal).year
+                to_year = datetime.date.fromordinal(to_ordinal).year
+                if state is not None:
+                    from_year = min(state.from_year, from_year)
+                    to_year = max(state.to_year, to_year)
+                for year in range(from_year, to_year + 1):
+                    self._year(year)
+                if self._origin_year is None:
+                    self._origin_year = from_year
+                state = self._state = _CalendarState(
+                    from_year, to_year, self._year_open_days, self._origin_year
+                )
+        return state
+
+    def _count(self, ordinal):
+        """Number of trading days on or before ``ordinal`` in the calendar."""
+        return self._ensure(ordinal, ordinal).count(ordinal)
+
+    def is_open(self, date):
+        # Only needs the year of ``date``, not a range reaching it.
+        open_days = self._year_open_days.get(date.year)
+        if open_days is None:
+            with self._lock:
+                open_days = self._year(date.year)
+        return open_days[date.toordinal() - datetime.date(date.year, 1, 1).toordinal()] == 1
+
+    def shift(self, date, days):
+        """Return the ordinal of the ``days``-th business day after ``date``.
+
+        Negative ``days`` count backwards. ``date`` itself is never counted.
+        """
+        if days == 0:
+            raise ValueError("days must not be 0.")
+        ordinal = date.toordinal()
+        state = self._ensure(ordinal, ordinal)
+        while True:
+            count = state.count(ordinal)
+            if days > 0:
+                index = count + days - 1
+                if index < len(state.ordinals):
+                    break
+                state = self._ensure(ordinal, state.last_ordinal + 1)
+            else:
+                index = count - state.is_open(ordinal) + days
+                if index >= 0:
+                    break
+                state = self._ensure(state.first_ordinal - 1, ordinal)
+        return state.ordinals[index]
+
+    def next(self, date, days=1):
+        return datetime.date.fromordinal(self.shift(date, days))
+
+    def previous(self, date, days=1):
+        return datetime.date.fromordinal(self.shift(date, -days))
+
+    def count(self, from_date, to_date):
+        """Number of business days in ``[from_date, to_date]``."""
+        from_ordinal = from_date.toordinal()
+        to_ordinal = to_date.toordinal()
+        if to_ordinal < from_ordinal:
+            return 0
+        state = self._ensure(from_ordinal - 1, to_ordinal)
+        return state.count(to_ordinal) - state.count(from_ordinal - 1)
+
+    def range(self, from_date, to_date):
+        """Business days in ``[from_date, to_date]`` as a list of dates."""
+        from_ordinal = from_date.toordinal()
+        to_ordinal = to_date.toordinal()
+        if to_ordinal < from_ordinal:
+            return []
+        state = self._ensure(from_ordinal - 1, to_ordinal)
+        start = state.count(from_ordinal - 1)
+        stop = state.count(to_ordinal)
+        return [datetime.date.fromordinal(ordinal) for ordinal in state.ordinals[start:stop]]
+
+    def is_open_array(self, dates):
+        """Vectorized ``is_open`` for an array of ``datetime64`` dates."""
+        import numpy as np
+
+        dates = np.asarray(dates).astype("datetime64[D]")
+        if len(dates) == 0:
+            return np.zeros(0, dtype=bool)
+        state = self._ensure(_to_ordinal(dates.min()), _to_ordinal(dates.max()))
+        offsets = dates.astype(np.int64) + (_EPOCH_ORDINAL - state.first_ordinal)
+        return np.frombuffer(state.open_days, dtype=np.bool_)[offsets]
+
+    def count_array(self, dates):
+        """Vectorized number of business days on or before each date.
+
+        Counts start from a fixed day, so those of separate calls can be
+        subtracted even if the range grew in between.
+        """
+        import numpy as np
+
+        dates = np.asarray(dates).astype("datetime64[D]")
+        if len(dates) == 0:
+            return np.zeros(0, dtype=np.int64)
+        state = self._ensure(_to_ordinal(dates.min()), _to_ordinal(dates.max()))
+        return np.searchsorted(state.days, dates, side="right") - state.base
+
+    def shift_array(self, dates, days):
+        """Vectorized ``shift`` returning ``datetime64[D]`` dates."""
+        import numpy as np
+
+        if days == 0:
+            raise ValueError("days must not be 0.")
+        dates = np.asarray(dates).astype("datetime64[D]")
+        if len(dates) == 0:
+            return dates
+        state = self._ensure(_to_ordinal(dates.min()), _to_ordinal(dates.max()))
+        while True:
+            counts = np.searchsorted(state.days, dates, side="right")
+            if days > 0:
+                indices = counts + days - 1
+                if indices.max() < len(state.ordinals):
+                    break
+                state = self._ensure(state.first_ordinal, state.last_ordinal + 1)
+            else:
+                offsets = dates.astype(np.int64) + (_EPOCH_ORDINAL - state.first_ordinal)
+                indices = counts - np.frombuffer(state.open_days, dtype=np.bool_)[offsets] + days
+                if indices.min() >= 0:
+                    break
+                state = self._ensure(state.first_ordinal - 1, state.last_ordinal)
+        return state.days[indices]
+
+
+@functools.lru_cache(maxsize=None)
+def get_calendar():
+    return TradingCalendar()
+
+
+def clear_calendar_cache():
+    """Rebuild the calendar on next use, e.g. after registering a new holiday."""
+    get_calendar.cache_clear()
+
+
+def set_calendar_range(from_year=2000, to_year=None):
+    """Years that ``get_calendar().days`` covers, ``to_year`` defaulting to two years ahead.
+
+    Also set by ``N225_CALENDAR_FROM_YEAR`` and ``N225_CALENDAR_TO_YEAR``.
+    """
+    global CALENDAR_FROM_YEAR, CALENDAR_TO_YEAR
+    CALENDAR_FROM_YEAR = from_year
+    CALENDAR_TO_YEAR = to_year
+    clear_calendar_cache()
+
+
+def to_day_array(timestamps):
+    """``datetime64[D]`` array of dates, datetimes or a ``DatetimeIndex``.
+
+    Timezone-aware indexes keep their local dates.
+    """
+    import numpy as np
+
+    if getattr(timestamps, "tz", None) is not None:
+        timestamps = timestamps.tz_localize(None)
+    return np.asarray(timestamps, dtype="datetime64[ns]").astype("datetime64[D]")
+
+
+def _shift_like(date, ordinal):
+    return date + timedelta(days=ordinal - date.toordinal())
+
+
+def is_market_open(date):
+    return get_calendar().is_open(date)
+
+
 def get_next_business_date(date, days=1):
-    next_bdate = date + timedelta(days=1)
-    count = 0
-    while True:
-        if is_market_open(next_bdate):
-            count += 1
-            if days <= count:
-                return next_bdate
-        next_bdate = next_bdate + timedelta(days=1)
+    return _shift_like(date, get_calendar().shift(date, days))
 
 
 def get_last_business_date(date, days=1):
-    next_bdate = date - timedelta(days=1)
-    count = 0
-    while True:
-        if is_market_open(next_bdate):
-            count += 1
-            if days <= count:
-                return next_bdate
-        next_bdate = next_bdate - timedelta(days=1)
+    return _shift_like(date, get_calendar().shift(date, -days))
+
+
+# Short sales settle T+2 and the borrowed stock is returned the next business day.
+SETTLEMENT_DAYS = 2
 
 
 def get_shinagashi_nissu(date):
-    borrow_date = get_next_business_date(date, 2)
+    calendar = get_calendar()
+    settlement_ordinal = calendar.shift(date, SETTLEMENT_DAYS)
+    return calendar.shift(datetime.date.fromordinal(settlement_ordinal), 1) - settlement_ordinal
+
+
+def get_shinagashi_calendar(trade_dates, settlement_days=SETTLEMENT_DAYS):
+    """Settlement and return dates of short sales for every trade date.
+
+    Returns a DataFrame indexed by the trade dates with ``settlement_date``,
+    ``settlement_offset`` (calendar days from the trade), ``return_date``
+    (the business day after settlement) and ``shinagashi_nissu``, the days
+    of lending fees between settlement and return.
+    """
+    import numpy as np
+    import pandas as pd
+
+    days = to_day_array(trade_dates)
+    calendar = get_calendar()
+    settlement_dates = calendar.shift_array(days, settlement_days)
+    return_dates = calendar.shift_array(settlement_dates, 1)
+    return pd.DataFrame(
+        {
+            "settlement_date": settlement_dates.astype("datetime64[ns]"),
+            "settlement_offset": (settlement_dates - days).astype(np.int64),
+            "return_date": return_dates.astype("datetime64[ns]"),
+            "shinagashi_nissu": (return_dates - settlement_dates).astype(np.int64),
+        },
+        index=pd.DatetimeIndex(days.astype("datetime64[ns]"), name="Date"),
+    )
+
+
+# Each session definition is a list of ``(effective_from, windows)`` sorted by
+# date, where a window is a ``(start, end)`` pair of times with an exclusive
+# end. A window whose end is not after its start runs past midnight and
+# belongs to the trading day on which it starts.
+STOCK_SESSIONS = [
+    (
+        datetime.date.min,
+        [(datetime.time(9), datetime.time(11, 30)), (datetime.time(12, 30), datetime.time(15))],
+    ),
+    (
+        datetime.date(2024, 11, 5),
+        [(datetime.time(9), datetime.time(11, 30)), (datetime.time(12, 30), datetime.time(15, 30))],
+    ),
+]
+FUTURES_DAY_SESSIONS = [
+    (datetime.date(2016, 7, 19), [(datetime.time(8, 45), datetime.time(15, 15))]),
+    (datetime.date(2024, 11, 5), [(datetime.time(8, 45), datetime.time(15, 45))]),
+]
+FUTURES_NIGHT_SESSIONS = [
+    (datetime.date(2016, 7, 19), [(datetime.time(16, 30), datetime.time(5, 30))]),
+    (datetime.date(2021, 9, 21), [(datetime.time(16, 30), datetime.time(6))]),
+    (datetime.date(2024, 11, 5), [(datetime.time(17), datetime.time(6))]),
+]
+
+
+def _time_to_timedelta(value):
+    import numpy as np
 
-    shinagashi_nissu = 1
-    return_date = borrow_date + timedelta(days=1)
-    for _ in range(30):
-        if is_market_open(return_date):
-            break
-        shinagashi_nissu += 1
-        return_date = return_date + timedelta(days=1)
-    else:
-        raise RuntimeError("Something Wrong.")
-    return shinagashi_nissu
+    return np.timedelta64(value.hour * 3600 + value.minute * 60 + value.second, "s")
 
 
-def get_stock_zaraba_filter(from_date, to_date, pandas_series):
+def get_session_filter(index, sessions=STOCK_SESSIONS, from_date=None, to_date=None):
+    """Boolean mask of the rows of a ``DatetimeIndex`` inside ``sessions``.
+
+    Only sessions starting on a trading day in ``[from_date, to_date]`` are
+    kept. The index is read once, so the cost is linear in its length.
+    """
+    import numpy as np
+
+    if getattr(index, "tz", None) is not None:
+        index = index.tz_localize(None)
+    timestamps = np.asarray(index, dtype="datetime64[ns]")
+    days = timestamps.astype("datetime64[D]")
+    times = timestamps - days
+    zaraba_filter = np.zeros(len(timestamps), dtype=bool)
+    if len(timestamps) == 0:
+        return zaraba_filter
+
+    calendar = get_calendar()
+    effective_dates = np.array(
+        [effective_from for effective_from, _ in sessions], dtype="datetime64[D]"
+    )
     from_date, to_date = _parse_date_inputs(from_date, to_date)
-    business_days = get_business_days(from_date, to_date)
-    zaraba_filter = None
-    for business_day in business_days:
-        business_dt = datetime.datetime.fromordinal(business_day.toordinal())
-        additional_filter = ((business_dt + timedelta(hours=9)) <= pandas_series.index) & (
-            pandas_series.index < (business_dt + timedelta(hours=11, minutes=30))
-        )
-        additional_filter |= (
-            (business_dt + timedelta(hours=12, minutes=30)) <= pandas_series.index
-        ) & (pandas_series.index < (business_dt + timedelta(hours=15)))
-        if zaraba_filter is None:
-            zaraba_filter = additional_filter
-        else:
-            zaraba_filter = zaraba_filter | additional_filter
+    candidates = {}
+    for day_offset in (0, 1):
+        session_days = days - day_offset
+        candidate = calendar.is_open_array(session_days)
+        if from_date is not None:
+            candidate &= session_days >= np.datetime64(from_date, "D")
+        if to_date is not None:
+            candidate &= session_days <= np.datetime64(to_date, "D")
+        periods = np.searchsorted(effective_dates, session_days, side="right") - 1
+        candidates[day_offset] = (candidate, periods)
+
+    for period, (_, windows) in enumerate(sessions):
+        for start, end in windows:
+            start = _time_to_timedelta(start)
+            end = _time_to_timedelta(end)
+            if start < end:
+                parts = [(0, start, end)]
+            else:
+                parts = [(0, start, np.timedelta64(1, "D")), (1, np.timedelta64(0, "s"), end)]
+            for day_offset, part_start, part_end in parts:
+                candidate, periods = candidates[day_offset]
+                zaraba_filter |= (
+                    candidate & (periods == period) & (part_start <= times) & (times < part_end)
+                )
     return zaraba_filter
 
 
+def get_stock_zaraba_filter(from_date, to_date, pandas_series, sessions=STOCK_SESSIONS):
+    return get_session_filter(pandas_series.index, sessions, from_date, to_date)
+
+
+def filter_stock_zaraba(from_date, to_date, pandas_series, sessions=STOCK_SESSIONS):
+    return pandas_series[get_stock_zaraba_filter(from_date, to_date, pandas_series, sessions)]
+
+
 def get_business_days(from_date, to_date):
     from_date, to_date = _parse_date_inputs(from_date, to_date)
-    current_date = from_date
-    business_days = []
-    if is_market_open(current_date):
-        business_days.append(current_date)
-
-    while True:
-        current_date = get_next_business_date(current_date)
-        if current_date <= to_date:
-            business_days.append(current_date)
-        else:
-            return business_days
+    return get_calendar().range(from_date, to_date)
 
 
 def _parse_date_inputs(from_date, to_date):
+    if isinstance(from_date, str) or isinstance(to_date, str):
+        import dateutil.parser
     if isinstance(from_date, str):
         from_date = dateutil.parser.parse(from_date)
     if isinstance(to_date, str):
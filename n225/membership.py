@@ -0,0 +1,89 @@
+"""Constituent membership matrix and change event stream."""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from .jpx import _parse_date_inputs, get_calendar
+from .weights import get_weight_table
+
+EVENT_COLUMNS = ["date", "code", "event", "minashi_before", "minashi_after"]
+
+
+def _trading_days(table, from_date, to_date):
+    from_date, to_date = _parse_date_inputs(from_date, to_date)
+    if from_date is None:
+        from_date = table.dates[0]
+    if to_date is None:
+        to_date = datetime.date.today()
+    return get_calendar().range(max(from_date, table.dates[0]), to_date)
+
+
+def get_membership_matrix(from_date=None, to_date=None):
+    """Boolean DataFrame of trading days by every stock code ever included.
+
+    A row is one gather of the per-period membership array, so slicing a
+    universe for any range needs no composition rebuilds.
+    """
+    table = get_weight_table()
+    days = pd.DatetimeIndex(_trading_days(table, from_date, to_date), name="Date")
+    members = np.asarray(table.members)[table.periods_of(days)]
+    return pd.DataFrame(members, index=days, columns=table.stock_codes)
+
+
+def get_member_days(stock_code, from_date=None, to_date=None):
+    """Trading days on which ``stock_code`` was a constituent."""
+    membership = get_membership_matrix(from_date, to_date)
+    return membership.index[membership[stock_code].to_numpy()]
+
+
+def get_composition_events():
+    """Add, remove and minashi change events, one row per stock and date."""
+    table = get_weight_table()
+    members = np.asarray(table.members)
+    minashi = np.asarray(table.minashi)
+    before, after = members[:-1], members[1:]
+    minashi_before, minashi_after = minashi[:-1], minashi[1:]
+    kinds = [
+        ("add", after & ~before),
+        ("remove", before & ~after),
+        ("minashi", before & after & (minashi_before != minashi_after)),
+    ]
+    frames = []
+    for kind, mask in kinds:
+        periods, columns = np.nonzero(mask)
+        frames.append(
+            pd.DataFrame(
+                {
+                    "date": pd.DatetimeIndex(table.dates)[periods + 1],
+                    "code": np.asarray(table.stock_codes, dtype=object)[columns],
+                    "event": kind,
+                    "minashi_before": minashi_before[periods, columns],
+                    "minashi_after": minashi_after[periods, columns],
+                }
+            )
+        )
+    events = pd.concat(frames, ignore_index=True)
+    return events.sort_values(["date", "event", "code"], kind="stable").reset_index(drop=True)
+
+
+def get_daily_compositions(from_date=None, to_date=None):
+    """Long table of every member on every trading day.
+
+    Columns are ``date``, ``code``, ``minashi``, ``weight`` and ``josuu``,
+    gathered from the weight table for all days at once.
+    """
+    table = get_weight_table()
+    days = pd.DatetimeIndex(_trading_days(table, from_date, to_date))
+    periods = table.periods_of(days)
+    days_index, columns = np.nonzero(np.asarray(table.members)[periods])
+    periods = periods[days_index]
+    return pd.DataFrame(
+        {
+            "date": days[days_index],
+            "code": np.asarray(table.stock_codes, dtype=object)[columns],
+            "minashi": np.asarray(table.minashi)[periods, columns],
+            "weight": np.asarray(table.weights)[periods, columns],
+            "josuu": np.asarray(table.josuu)[periods],
+        }
+    )
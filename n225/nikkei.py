@@ -0,0 +1,171 @@
+"""On-disk cache of the official daily index data from indexes.nikkei.co.jp.
+
+The history is stored as a NumPy npz file with the dates, one float column
+per field and the validators of the last response. A cache younger than the
+TTL is served as is. Otherwise the CSV is requested conditionally and only
+the rows after the last cached date are parsed and appended. Refreshes hold
+an exclusive lock on a file next to the cache so that concurrent processes
+download once, and the cache is replaced atomically so readers never see a
+partial file.
+"""
+import csv
+import datetime
+import os
+import time
+from pathlib import Path
+
+import kanilog
+import numpy as np
+import pandas as pd
+
+from .timeline import file_lock, replace_file
+
+logger = kanilog.get_module_logger(__file__, 1)
+
+DAILY_CSV_URL = "https://indexes.nikkei.co.jp/nkave/historical/nikkei_stock_average_daily_jp.csv"
+CACHE_PATH = (
+    Path(os.environ.get("N225_CACHE_DIR", Path.home() / ".cache" / "n225")) / "nikkei_daily.npz"
+)
+DEFAULT_TTL = 3600
+OFFLINE = os.environ.get("N225_OFFLINE") == "1"
+INDEX_NAME = "データ日付"
+
+
+class DailyDataCache(object):
+    def __init__(self, path=CACHE_PATH):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+
+    def lock(self):
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        return file_lock(self.lock_path)
+
+    def load(self):
+        if not self.path.exists():
+            return None
+        with np.load(self.path) as npz:
+            return {name: npz[name] for name in npz.files}
+
+    def save(self, data):
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        replace_file(self.path, lambda f: np.savez(f, **data), "wb")
+
+
+def is_fresh(data, ttl):
+    return time.time() - float(data["fetched_at"]) < ttl
+
+
+def parse_daily_csv(text, after=None):
+    """Columns, dates and values of the rows dated after ``after``.
+
+    The CSV is newest last, so it is read backwards and stops at the first
+    row that is already known. Rows whose first field is not a date, like
+    the trailing notice, are skipped.
+    """
+    lines = text.splitlines()
+    columns = next(csv.reader([lines[0]]))[1:]
+    dates = []
+    values = []
+    for line in reversed(lines[1:]):
+        row = next(csv.reader([line]), None)
+        if not row:
+            continue
+        try:
+            date = datetime.datetime.strptime(row[0], "%Y/%m/%d").date()
+        except ValueError:
+            continue
+        if after is not None and date <= after:
+            break
+        dates.append(date)
+        values.append([float(value) if value else np.nan for value in row[1 : len(columns) + 1]])
+    dates.reverse()
+    values.reverse()
+    return (
+        columns,
+        np.array(dates, dtype="datetime64[D]"),
+        np.array(values, dtype=np.float64).reshape(len(values), len(columns)),
+    )
+
+
+def _conditional_headers(data):
+    headers = {}
+    if data is not None:
+        if str(data["etag"]):
+            headers["If-None-Match"] = str(data["etag"])
+        if str(data["last_modified"]):
+            headers["If-Modified-Since"] = str(data["last_modified"])
+    return headers
+
+
+def refresh(cache, data, fetcher):
+    """Fetch the CSV and return ``data`` with the new rows appended."""
+    response = fetcher.get(DAILY_CSV_URL, headers=_conditional_headers(data))
+    if response.status_code == 304 and data is not None:
+        logger.info("Daily data not modified.")
+        data = dict(data, fetched_at=np.float64(time.time()))
+        cache.save(data)
+        return data
+    if response.status_code != 200:
+        raise IOError(f"Got status {response.status_code} from {DAILY_CSV_URL}")
+
+    text = response.content.decode("ms932")
+    if data is None:
+        columns, dates, values = parse_daily_csv(text)
+    else:
+        last_date = data["dates"][-1].item() if len(data["dates"]) else None
+        columns, dates, values = parse_daily_csv(text, after=last_date)
+        if columns != [str(column) for column in data["columns"]]:
+            logger.warning("Columns changed to %s. Rebuilding the cache.", columns)
+            columns, dates, values = parse_daily_csv(text)
+        else:
+            dates = np.concatenate([data["dates"], dates])
+            values = np.concatenate([data["values"], values])
+    logger.info("Daily data has %s rows.", len(dates))
+    data = {
+        "columns": np.array(columns),
+        "dates": dates,
+        "values": values,
+        "fetched_at": np.float64(time.time()),
+        "etag": np.array(response.headers.get("ETag") or ""),
+        "last_modified": np.array(response.headers.get("Last-Modified") or ""),
+    }
+    cache.save(data)
+    return data
+
+
+def _to_frame(data):
+    index = pd.DatetimeIndex(data["dates"].astype("datetime64[ns]"), name=INDEX_NAME)
+    columns = [str(column) for column in data["columns"]]
+    return pd.DataFrame(data["values"], index=index, columns=columns)
+
+
+def load_daily_data(
+    cache_path=None, ttl=DEFAULT_TTL, offline=OFFLINE, fixture_path=None, fetcher=None
+):
+    """Daily index data served from the cache and refreshed after ``ttl`` seconds.
+
+    ``fixture_path`` replays a saved CSV through ``FixtureSession`` instead
+    of the network. With ``offline``, which ``N225_OFFLINE=1`` turns on by
+    default, the cache is served however old it is, and without a cache only
+    ``fixture_path`` is read.
+    """
+    cache = DailyDataCache(CACHE_PATH if cache_path is None else cache_path)
+    data = cache.load()
+    if data is not None and (offline or is_fresh(data, ttl)):
+        return _to_frame(data)
+    if offline and fixture_path is None:
+        raise FileNotFoundError(f"No cached daily data at {cache.path}")
+
+    from .download import Fetcher, FixtureSession
+
+    if fetcher is None:
+        if fixture_path is not None:
+            fetcher = Fetcher(FixtureSession(fixture_path), rate=None, retries=0)
+        else:
+            fetcher = Fetcher(rate=None)
+    with cache.lock():
+        # Another process may have refreshed while this one waited.
+        data = cache.load()
+        if data is None or not is_fresh(data, ttl):
+            data = refresh(cache, data, fetcher)
+    return _to_frame(data)
@@ -0,0 +1,286 @@
+"""Parsing of the downloaded Nikkei announcement PDFs with a per-file cache."""
+import collections
+import datetime
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import jpholiday
+import kanilog
+import mojimoji
+import pandas as pd
+
+from . import instrumentation
+from .jpx import get_next_business_date
+from .timeline import normalize_code, replace_file
+
+logger = kanilog.get_module_logger(__file__, 1)
+
+# Bump whenever iter_change_records can yield different records for the same
+# file so that cached results are not reused.
+PARSER_VERSION = 2
+# The error of a failure that parsing the same file again would repeat.
+UNEXPECTED_LAYOUT = "unexpected layout"
+
+PARSED_TITLES = (
+    "日経平均株価等の構成銘柄の取り扱いについて",
+    "日経平均株価の銘柄定期入れ替え等について",
+    "日経平均株価の銘柄定期入れ替えについて",
+)
+# Names of the parser branch used for each title in the run report.
+PARSER_BRANCHES = {
+    "日経平均株価等の構成銘柄の取り扱いについて": "handling",
+    "日経平均株価の銘柄定期入れ替え等について": "periodic_review_and_splits",
+    "日経平均株価の銘柄定期入れ替えについて": "periodic_review",
+}
+
+ChangeRecord = collections.namedtuple(
+    "ChangeRecord", ["date", "remove", "add", "minashi", "josuu", "source"]
+)
+JosuuRecord = collections.namedtuple("JosuuRecord", ["date", "josuu", "source"])
+
+
+def get_doc_date(pdf_file):
+    try:
+        return datetime.datetime.strptime(Path(pdf_file).name[0:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def _get_target_date(doc_date, month, day):
+    target_date = datetime.date(doc_date.year, month, day)
+    if target_date < doc_date:
+        target_date = datetime.date(doc_date.year + 1, month, day)
+    if jpholiday.is_holiday(target_date):
+        target_date = get_next_business_date(target_date)
+    return target_date
+
+
+def _change_record(target_date, remove, add, minashi, pdf_file):
+    return ChangeRecord(
+        target_date, normalize_code(remove), normalize_code(add), str(minashi), None, pdf_file.name
+    )
+
+
+def _unexpected_layout(pdf_file, outcome):
+    logger.warning("Not parsed %s: %s", pdf_file.name, UNEXPECTED_LAYOUT)
+    outcome.update(status="failed", error=UNEXPECTED_LAYOUT)
+
+
+def iter_change_records(pdf_file, outcome=None):
+    """Yield a ``ChangeRecord`` for every change announced in ``pdf_file``.
+
+    ``outcome`` is filled with the parser ``branch`` that matched, the
+    ``status`` of the parse, one of parsed, skipped and failed, and the
+    ``error`` of a failure.
+    """
+    if outcome is None:
+        outcome = {}
+    outcome.update(branch=None, status="skipped", error=None)
+    pdf_file = Path(pdf_file)
+    logger.info("parsing %s", pdf_file.name)
+    titles = [title for title in PARSED_TITLES if title in pdf_file.name]
+    if not titles:
+        logger.warning("Not parsed %s: unknown title", pdf_file.name)
+        return
+    outcome["branch"] = PARSER_BRANCHES[titles[0]]
+    import pdftotext
+    import tabula
+
+    try:
+        doc_date = get_doc_date(pdf_file)
+        if "日経平均株価等の構成銘柄の取り扱いについて" in pdf_file.name:
+            with pdf_file.open("rb") as f:
+                pdf = pdftotext.PDF(f)
+            text = "\n".join(list(pdf))
+            text = text.replace("\n", "")
+            remove = re.search(r"「.+?(\d+)）」", text).group(1)
+
+            span1 = re.search(r"１．日経平均株価", text).span()
+            span2 = re.search(r"２．", text).span()
+            content = text[span1[1]: span2[0]].replace(" ", "")
+            minashi = mojimoji.zen_to_han(
+                re.search(r"みなし額面は([0-9０-９/／]+)", content).group(1)
+            )
+            add = re.search(r"「.+?（(\d+)）」を採用", content).group(1).strip()
+            date = re.search("([０-９0-9]+)月([０-９0-9]+)日", content)
+            month = int(mojimoji.zen_to_han(date.group(1)))
+            day = int(mojimoji.zen_to_han(date.group(2)))
+            target_date = _get_target_date(doc_date, month, day)
+            yield _change_record(target_date, remove, add, minashi, pdf_file)
+        elif "日経平均株価の銘柄定期入れ替え等について" in pdf_file.name:
+            dfs = tabula.read_pdf(pdf_file, pages="all")
+            if len(dfs) == 2:
+                df = dfs[0]
+                df["実施日"] = df["実施日"].ffill().bfill()
+                df = df[~(df["コード"].isna() & df["採用銘柄"].isna() & df["コード.1"].isna() & df["コード.1"].isna())]
+                for idx, row in df.iterrows():
+                    add = row["コード"]
+                    remove = row["コード.1"]
+                    minashi = re.search(r"\(([\.0-9/]+)\)", row["採用銘柄"]).group(1)
+                    date = re.search("([０-９0-9]+)月([ ０-９0-9]+)日", row["実施日"])
+                    month = int(mojimoji.zen_to_han(date.group(1)))
+                    day = int(mojimoji.zen_to_han(date.group(2)))
+                    target_date = _get_target_date(doc_date, month, day)
+                    yield _change_record(target_date, remove, add, minashi, pdf_file)
+
+                with pdf_file.open("rb") as f:
+                    pdf = pdftotext.PDF(f)
+                text = "\n".join(list(pdf))
+                span = re.search(r"．.*株式", text).span()
+                content = text[span[1]:]
+                date = re.search("([ ０-９0-9]+)月([ ０-９0-9]+)日", content)
+                month = int(mojimoji.zen_to_han(date.group(1)))
+                day = int(mojimoji.zen_to_han(date.group(2)))
+                target_date = _get_target_date(doc_date, month, day)
+
+                split_df = dfs[1]
+                for idx, row in split_df.iterrows():
+                    add = row["コード"]
+                    remove = row["コード"]
+                    minashi = re.search(r"([0-9/]+)円", row["新みなし額面"]).group(1)
+                    yield _change_record(target_date, remove, add, minashi, pdf_file)
+            else:
+                _unexpected_layout(pdf_file, outcome)
+        elif "日経平均株価の銘柄定期入れ替えについて" in pdf_file.name:
+            dfs = tabula.read_pdf(pdf_file, pages="all")
+            if len(dfs) == 1:
+                df = dfs[0]
+                df = df.dropna(axis=1)
+                for column in df.columns:
+                    if " " in column:
+                        name1, name2 = column.split(" ", 1)
+                        splited = df[column].str.split(" ", n=1, expand=True)
+                        if name1 in df:
+                            name1 += ".1"
+                        if name2 in df:
+                            name2 += ".1"
+                        df[[name1, name2]] = splited
+                for idx, row in df.iterrows():
+                    add = row["コード"].strip()
+                    remove = row["コード.1"].strip()
+                    minashi = re.search(r"\(([0-9/]+)\)", row["採用銘柄"]).group(1)
+                    date = re.search("([０-９0-9]+)月([０-９0-9]+)日", row["実施日"])
+                    month = int(mojimoji.zen_to_han(date.group(1)))
+                    day = int(mojimoji.zen_to_han(date.group(2)))
+                    target_date = _get_target_date(doc_date, month, day)
+                    yield _change_record(target_date, remove, add, minashi, pdf_file)
+            else:
+                _unexpected_layout(pdf_file, outcome)
+    except Exception as e:
+        logger.warning("Not parsed %s: %r", pdf_file.name, e)
+        outcome.update(status="failed", error=repr(e))
+        return
+    if outcome["status"] != "failed":
+        outcome["status"] = "parsed"
+
+
+def parse_pdf_with_outcome(pdf_file):
+    """Records of ``iter_change_records`` and its outcome with the ``seconds`` taken."""
+    outcome = {}
+    start = time.perf_counter()
+    records = list(iter_change_records(pdf_file, outcome))
+    outcome["seconds"] = time.perf_counter() - start
+    return records, outcome
+
+
+def iter_josuu_records(pdf_files):
+    """Yield the josuu announced by each josuu PDF, effective the next business day."""
+    for pdf_file in pdf_files:
+        pdf_file = Path(pdf_file)
+        doc_date = get_doc_date(pdf_file)
+        josuu = re.search(r"([0-9\.]+)", pdf_file.name[12:]).group(1)
+        yield JosuuRecord(get_next_business_date(doc_date), josuu, pdf_file.name)
+
+
+def build_change_df(change_records, josuu_records):
+    """Materialize records into the n225.csv layout in one pass.
+
+    Records are sorted by date, keeping their order within a date, and each
+    change takes the josuu announced for its date or else the latest before.
+    """
+    change_df = pd.DataFrame(list(change_records), columns=ChangeRecord._fields)
+    josuu_df = pd.DataFrame(list(josuu_records), columns=JosuuRecord._fields)
+    josuu_df = josuu_df.sort_values("source").drop_duplicates("date", keep="last")
+    change_df = change_df.drop(columns=["josuu", "source"]).merge(
+        josuu_df[["date", "josuu"]], on="date", how="left"
+    )
+    change_df = change_df.sort_values("date", kind="stable")
+    change_df["josuu"] = change_df["josuu"].ffill()
+    change_df = change_df.rename(columns=str.capitalize).set_index("Date")
+    return change_df
+
+
+class ParseCache(object):
+    """Parsed records stored as one JSON file per PDF content and parser version."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def key(self, pdf_file):
+        pdf_file = Path(pdf_file)
+        digest = hashlib.sha256(pdf_file.name.encode("utf-8"))
+        digest.update(pdf_file.read_bytes())
+        return f"{digest.hexdigest()}-v{PARSER_VERSION}"
+
+    def get(self, key):
+        cache_file = self.path / f"{key}.json"
+        if not cache_file.exists():
+            return None
+        rows = json.loads(cache_file.read_text())
+        return [ChangeRecord(datetime.date.fromisoformat(row[0]), *row[1:]) for row in rows]
+
+    def put(self, key, records):
+        self.path.mkdir(exist_ok=True, parents=True)
+        rows = [[record.date.isoformat()] + list(record[1:]) for record in records]
+        replace_file(self.path / f"{key}.json", lambda f: json.dump(rows, f))
+
+
+def parse_pdf_files(pdf_files, cache_path=None, max_workers=None):
+    """Parse ``pdf_files`` and return their change records in the same order.
+
+    Files found in the cache at ``cache_path`` are not parsed again. The rest
+    are split into one batch per worker process, so each worker reuses its
+    JVM for the tabula calls of its batch.
+    """
+    pdf_files = [Path(pdf_file) for pdf_file in pdf_files]
+    cache = ParseCache(cache_path) if cache_path is not None else None
+    keys = {}
+    results = {}
+    for pdf_file in pdf_files:
+        if cache is not None:
+            keys[pdf_file] = cache.key(pdf_file)
+            records = cache.get(keys[pdf_file])
+            if records is not None:
+                logger.info("Using cached %s", pdf_file.name)
+                results[pdf_file] = records
+                instrumentation.count("pdfs_cached")
+
+    misses = [pdf_file for pdf_file in pdf_files if pdf_file not in results]
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers <= 1 or len(misses) <= 1:
+        parsed = [parse_pdf_with_outcome(pdf_file) for pdf_file in misses]
+    else:
+        max_workers = min(max_workers, len(misses))
+        chunksize = math.ceil(len(misses) / max_workers)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            parsed = list(executor.map(parse_pdf_with_outcome, misses, chunksize=chunksize))
+    for pdf_file, (records, outcome) in zip(misses, parsed):
+        results[pdf_file] = records
+        instrumentation.record_file("parse", pdf_file.name, records=len(records), **outcome)
+        instrumentation.count(f"pdfs_{outcome['status']}")
+        if outcome["branch"] is not None:
+            instrumentation.count(f"parser_branch_{outcome['branch']}")
+        # An exception may be transient, e.g. of the JVM, so it is parsed
+        # again on the next run rather than cached as no records. A layout
+        # mismatch is not, and is cached until PARSER_VERSION changes.
+        transient = outcome["status"] == "failed" and outcome["error"] != UNEXPECTED_LAYOUT
+        if cache is not None and not transient:
+            cache.put(keys[pdf_file], records)
+    return [results[pdf_file] for pdf_file in pdf_files]
@@ -0,0 +1,121 @@
+"""Download and parse pipeline that regenerates data/n225.csv.
+
+Imported lazily by ``n225`` because it needs pandas, pdftotext, tabula and
+kanirequests, which the composition and calendar API does not.
+"""
+import datetime
+from pathlib import Path
+
+import kanilog
+
+from . import clear_compositions_cache, instrumentation
+from .download import DownloadManifest, Fetcher, FixtureSession, download_listing_pdfs
+from .parse import build_change_df, get_doc_date, iter_josuu_records, parse_pdf_files
+from .timeline import csv_lock, replace_csv
+
+logger = kanilog.get_module_logger(__file__, 1)
+
+
+def _get_manifest(pdf_path, manifest_path):
+    if manifest_path is None:
+        manifest_path = pdf_path.parent / "manifest.json"
+    return DownloadManifest(manifest_path)
+
+
+def _download_pdfs(
+    listing_urls, keyword, pdf_path, manifest_path, stop_at_known, fixture_path, fetcher
+):
+    pdf_path.mkdir(exist_ok=True, parents=True)
+    if fetcher is None:
+        if fixture_path is not None:
+            fetcher = Fetcher(FixtureSession(fixture_path), rate=None, retries=0)
+        else:
+            fetcher = Fetcher()
+    manifest = _get_manifest(pdf_path, manifest_path)
+    downloaded = 0
+    with manifest.lock():
+        manifest.load()
+        for listing_url in listing_urls:
+            downloaded += download_listing_pdfs(
+                fetcher, listing_url, keyword, pdf_path, manifest, stop_at_known
+            )
+    return downloaded
+
+
+def download_kouseimeigara_pdfs(
+    download_path=None, manifest_path=None, stop_at_known=True, fixture_path=None, fetcher=None
+):
+    if download_path is None:
+        pdf_path = Path(__file__).parent / "pdf/kousei"
+    else:
+        pdf_path = Path(download_path)
+    return _download_pdfs(
+        ["https://indexes.nikkei.co.jp/nkave/newsroom?evt=10016&idxtag=00001&page={page}"],
+        "銘柄",
+        pdf_path,
+        manifest_path,
+        stop_at_known,
+        fixture_path,
+        fetcher,
+    )
+
+
+def download_josuu_pdfs(
+    download_path=None, manifest_path=None, stop_at_known=True, fixture_path=None, fetcher=None
+):
+    if download_path is None:
+        pdf_path = Path(__file__).parent / "pdf/josuu"
+    else:
+        pdf_path = Path(download_path)
+    return _download_pdfs(
+        [
+            "https://indexes.nikkei.co.jp/nkave/newsroom?evt=10022&idxtag=00001&page={page}",
+            "https://indexes.nikkei.co.jp/nkave/newsroom?evt=&idxtag=00001&page={page}",
+        ],
+        "除数",
+        pdf_path,
+        manifest_path,
+        stop_at_known,
+        fixture_path,
+        fetcher,
+    )
+
+
+def parse_pdfs(download_path=None, josuu_path=None, cache_path=None, max_workers=None):
+    if download_path is None:
+        pdf_path = Path(__file__).parent / "pdf/kousei"
+    else:
+        pdf_path = Path(download_path)
+    if josuu_path is None:
+        josuu_path = pdf_path.parent / "josuu"
+
+    # One regeneration at a time. The parse cache is shared too.
+    with csv_lock():
+        pdf_files = []
+        for pdf_file in reversed(sorted(list(pdf_path.glob("*.pdf")))):
+            doc_date = get_doc_date(pdf_file)
+            if doc_date is not None and doc_date < datetime.date(2019, 7, 1):
+                logger.warning("Not implemented yet before 2019-7-1.")
+                break
+            pdf_files.append(pdf_file)
+        if cache_path is None:
+            cache_path = pdf_path.parent / "parse_cache"
+        with instrumentation.stage("parse_pdf_files"):
+            parsed = parse_pdf_files(pdf_files, cache_path, max_workers)
+
+        change_records = []
+        for records in parsed:
+            change_records.extend(records)
+        manifest = _get_manifest(pdf_path, None)
+        with manifest.lock():
+            manifest.load()
+            for pdf_file, records in zip(pdf_files, parsed):
+                manifest.mark_parsed(pdf_file.name, len(records) > 0)
+            manifest.save()
+
+        josuu_files = sorted(Path(josuu_path).glob("*.pdf"))
+        with instrumentation.stage("write_csv"):
+            output_df = build_change_df(change_records, iter_josuu_records(josuu_files))
+            generation = replace_csv(output_df.to_csv)
+        logger.info("Wrote generation %s of n225.csv", generation)
+        clear_compositions_cache()
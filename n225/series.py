@@ -0,0 +1,41 @@
+"""Josuu and minashi histories with vectorized as-of lookups."""
+import numpy as np
+import pandas as pd
+
+from .weights import get_weight_table
+
+
+def _effective_index(table):
+    return pd.DatetimeIndex(table.dates, name="Date")
+
+
+def get_josuu_history():
+    """Josuu indexed by the date from which each value is effective."""
+    table = get_weight_table()
+    return pd.Series(np.array(table.josuu), index=_effective_index(table), name="josuu")
+
+
+def get_minashi_history():
+    """Minashi of every stock code, ``nan`` while not a member, per effective date."""
+    table = get_weight_table()
+    return pd.DataFrame(
+        np.array(table.minashi), index=_effective_index(table), columns=table.stock_codes
+    )
+
+
+def get_josuu_asof(index):
+    """Josuu in effect at each timestamp of ``index``."""
+    table = get_weight_table()
+    periods = table.periods_of(index)
+    return pd.Series(np.asarray(table.josuu)[periods], index=index, name="josuu")
+
+
+def get_minashi_asof(index, stock_codes=None):
+    """Minashi in effect at each timestamp of ``index`` for ``stock_codes``."""
+    table = get_weight_table()
+    periods = table.periods_of(index)
+    if stock_codes is None:
+        stock_codes = table.stock_codes
+    columns = [table.code_index[stock_code] for stock_code in stock_codes]
+    minashi = np.asarray(table.minashi)[np.ix_(periods, columns)]
+    return pd.DataFrame(minashi, index=index, columns=list(stock_codes))
@@ -0,0 +1,92 @@
+"""Josuu and weight changes of hypothetical composition changes."""
+import collections
+from fractions import Fraction
+
+import numpy as np
+import pandas as pd
+
+from .timeline import CONSTITUENT_COUNT, normalize_code
+from .weights import get_weight_table
+
+# One replacement like the rows of data/n225.csv. ``remove`` equal to ``add``
+# changes the minashi of a member, e.g. after a stock split. ``minashi`` is
+# that of the added stock.
+Change = collections.namedtuple("Change", ["remove", "add", "minashi"])
+Scenario = collections.namedtuple("Scenario", ["josuu", "weights", "weight_deltas"])
+
+
+class ScenarioSet(object):
+    """What-if compositions on top of the composition in effect on ``date``.
+
+    Each scenario is a list of ``Change``. The new josuu keeps the index
+    value of the ``prices`` snapshot unchanged across the changes, that is
+    ``josuu * new adjusted price sum / old adjusted price sum``. Arrays have
+    one row per scenario and one column per ``stock_codes``, the members on
+    ``date`` followed by the stocks any scenario adds.
+    """
+
+    def __init__(self, date, scenarios, prices):
+        table = get_weight_table()
+        period = table.period_of(date)
+        member_codes = table.member_codes(period)
+        added_codes = sorted(
+            {normalize_code(change.add) for changes in scenarios for change in changes}.difference(
+                member_codes
+            )
+        )
+        self.date = date
+        self.stock_codes = member_codes + added_codes
+        code_index = {code: i for i, code in enumerate(self.stock_codes)}
+
+        base_minashi = np.full(len(self.stock_codes), np.nan)
+        base_minashi[: len(member_codes)] = np.asarray(table.minashi)[
+            period, table.member_indices[period]
+        ]
+        # Changes are applied in order, so a later change may replace a stock
+        # that an earlier one of the same scenario added.
+        self.minashi = np.tile(base_minashi, (len(scenarios), 1))
+        for i, changes in enumerate(scenarios):
+            members = set(member_codes)
+            for change in changes:
+                remove = normalize_code(change.remove)
+                add = normalize_code(change.add)
+                if remove not in members:
+                    raise ValueError(f"{remove} is not a member in scenario {i}.")
+                if add != remove and add in members:
+                    raise ValueError(f"{add} is already a member in scenario {i}.")
+                members.discard(remove)
+                members.add(add)
+                self.minashi[i, code_index[remove]] = np.nan
+                self.minashi[i, code_index[add]] = float(Fraction(str(change.minashi)))
+        counts = (~np.isnan(self.minashi)).sum(axis=1)
+        assert (counts == CONSTITUENT_COUNT).all(), f"Scenarios have {counts} stocks."
+
+        prices = np.array([float(prices[code]) for code in self.stock_codes])
+        self.josuu_before = float(table.josuu[period])
+        self.index_value = np.nansum(prices * 50 / base_minashi) / self.josuu_before
+        self.josuu = np.nansum(prices * 50 / self.minashi, axis=1) / self.index_value
+        self.base_weights = np.where(np.isnan(base_minashi), 0.0, 50 / base_minashi)
+        self.base_weights /= self.josuu_before
+        self.weights = np.where(np.isnan(self.minashi), 0.0, 50 / self.minashi)
+        self.weights /= self.josuu[:, None]
+        self.weight_deltas = self.weights - self.base_weights
+
+    def __len__(self):
+        return len(self.josuu)
+
+    def scenario(self, i):
+        return Scenario(
+            float(self.josuu[i]),
+            pd.Series(self.weights[i], index=self.stock_codes),
+            pd.Series(self.weight_deltas[i], index=self.stock_codes),
+        )
+
+
+def simulate_scenarios(date, scenarios, prices):
+    """Evaluate many lists of ``Change`` at once. See ``ScenarioSet``."""
+    return ScenarioSet(date, scenarios, prices)
+
+
+def simulate_changes(date, changes, prices):
+    """New josuu, weights and weight deltas after ``changes`` on ``date``."""
+    return ScenarioSet(date, [changes], prices).scenario(0)
@@ -0,0 +1,155 @@
+"""SQ and last trading day calendar for futures and options."""
+import threading
+
+from nth_weekday import get_nth_weekday
+
+from .jpx import get_calendar, to_day_array
+
+QUARTERLY_MONTHS = (3, 6, 9, 12)
+
+
+def get_sq_date(year, month):
+    """SQ of ``year``/``month``: the second Friday, or the business day before."""
+    sq_date = get_nth_weekday(4, year, month, 1)
+    calendar = get_calendar()
+    if not calendar.is_open(sq_date):
+        sq_date = calendar.previous(sq_date)
+    return sq_date
+
+
+class SQCalendar(object):
+    """SQ dates of every month from ``from_year`` to ``to_year``.
+
+    Monthly SQ dates serve the mini and micro options, the quarterly subset
+    the futures. The last trading day is the business day before each SQ.
+    ``monthly_sq_dates`` reuses SQ dates already known for the range.
+    """
+
+    def __init__(self, from_year, to_year, monthly_sq_dates=None):
+        import numpy as np
+
+        self.from_year = from_year
+        self.to_year = to_year
+        months = [
+            (year, month) for year in range(from_year, to_year + 1) for month in range(1, 13)
+        ]
+        calendar = get_calendar()
+        if monthly_sq_dates is None:
+            monthly_sq_dates = [get_sq_date(year, month) for year, month in months]
+        self.monthly_sq_dates = list(monthly_sq_dates)
+        self.quarterly_sq_dates = [
+            sq_date
+            for (_, month), sq_date in zip(months, self.monthly_sq_dates)
+            if month in QUARTERLY_MONTHS
+        ]
+        self._arrays = {}
+        for monthly, sq_dates in ((True, self.monthly_sq_dates), (False, self.quarterly_sq_dates)):
+            last_trading_days = [calendar.previous(sq_date) for sq_date in sq_dates]
+            self._arrays[monthly] = (
+                np.array(sq_dates, dtype="datetime64[D]"),
+                np.array(last_trading_days, dtype="datetime64[D]"),
+            )
+
+    def covers(self, from_year, to_year):
+        return self.from_year <= from_year and to_year <= self.to_year
+
+    def extended(self, from_year, to_year):
+        """Calendar of ``from_year`` to ``to_year`` reusing the SQ dates of this one."""
+        monthly_sq_dates = []
+        for year in range(from_year, to_year + 1):
+            if self.from_year <= year <= self.to_year:
+                start = (year - self.from_year) * 12
+                monthly_sq_dates.extend(self.monthly_sq_dates[start : start + 12])
+            else:
+                monthly_sq_dates.extend(get_sq_date(year, month) for month in range(1, 13))
+        return SQCalendar(from_year, to_year, monthly_sq_dates)
+
+    def sq_dates(self, monthly=False):
+        return self.monthly_sq_dates if monthly else self.quarterly_sq_dates
+
+    def last_trading_days(self, monthly=False):
+        return [day.item() for day in self._arrays[monthly][1]]
+
+    def next_sq_dates(self, timestamps, monthly=False, inclusive=False):
+        """Next SQ date after the date of each timestamp as ``datetime64[D]``.
+
+        With ``inclusive`` an SQ falling on the date itself counts as next.
+        Dates past the calendar range give ``NaT``.
+        """
+        import numpy as np
+
+        sq_dates = self._arrays[monthly][0]
+        positions = np.searchsorted(sq_dates, to_day_array(timestamps), side="left" if inclusive else "right")
+        next_sq_dates = np.full(len(positions), np.datetime64("NaT"), dtype="datetime64[D]")
+        found = positions < len(sq_dates)
+        next_sq_dates[found] = sq_dates[positions[found]]
+        return next_sq_dates
+
+    def days_to_sq(self, timestamps, monthly=False, inclusive=False, business_days=False):
+        """Calendar days, or business days, from each timestamp to its next SQ.
+
+        Dates past the calendar range give ``NaT`` as int64, like the
+        calendar days of ``NaT`` dates.
+        """
+        import numpy as np
+
+        days = to_day_array(timestamps)
+        next_sq_dates = self.next_sq_dates(days, monthly, inclusive)
+        if business_days:
+            calendar = get_calendar()
+            found = ~np.isnat(next_sq_dates)
+            days_to_sq = np.full(len(days), np.datetime64("NaT").astype("int64"))
+            days_to_sq[found] = calendar.count_array(next_sq_dates[found]) - calendar.count_array(
+                days[found]
+            )
+            return days_to_sq
+        return (next_sq_dates - days).astype("int64")
+
+
+# One calendar grown to the years asked for so far.
+_sq_calendar = None
+_sq_calendar_lock = threading.Lock()
+
+
+def _get_covering_calendar(from_year, to_year):
+    global _sq_calendar
+    sq_calendar = _sq_calendar
+    if sq_calendar is not None and sq_calendar.covers(from_year, to_year):
+        return sq_calendar
+    with _sq_calendar_lock:
+        sq_calendar = _sq_calendar
+        if sq_calendar is None:
+            sq_calendar = _sq_calendar = SQCalendar(from_year, to_year)
+        elif not sq_calendar.covers(from_year, to_year):
+            sq_calendar = _sq_calendar = sq_calendar.extended(
+                min(from_year, sq_calendar.from_year), max(to_year, sq_calendar.to_year)
+            )
+    return sq_calendar
+
+
+def get_sq_calendar(from_year, to_year):
+    """SQ calendar of exactly ``from_year`` to ``to_year`` from the shared one."""
+    sq_calendar = _get_covering_calendar(from_year, to_year)
+    if (sq_calendar.from_year, sq_calendar.to_year) == (from_year, to_year):
+        return sq_calendar
+    return sq_calendar.extended(from_year, to_year)
+
+
+def _covering_calendar(days):
+    # Through the next year, so that every date has a next SQ.
+    years = days[[days.argmin(), days.argmax()]].astype("datetime64[Y]").astype("int64") + 1970
+    return _get_covering_calendar(int(years[0]), int(years[1]) + 1)
+
+
+def get_next_sq_dates(timestamps, monthly=False, inclusive=False):
+    days = to_day_array(timestamps)
+    if len(days) == 0:
+        return days
+    return _covering_calendar(days).next_sq_dates(days, monthly, inclusive)
+
+
+def get_days_to_sq(timestamps, monthly=False, inclusive=False, business_days=False):
+    days = to_day_array(timestamps)
+    if len(days) == 0:
+        return days.astype("int64")
+    return _covering_calendar(days).days_to_sq(days, monthly, inclusive, business_days)
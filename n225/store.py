@@ -0,0 +1,268 @@
+"""Compiled binary composition store read through one shared memory map.
+
+The CSVs stay the source of truth. ``compile_store`` writes their timeline
+into one file: a fixed prefix, a JSON header with the stock code dictionary,
+the minashi and josuu texts, the array layout and the stat and SHA-256 of the
+source CSVs, and then the arrays at aligned offsets. Every process that loads
+it maps the same pages. Compositions are looked up through ``memoryview`` so
+that ``get_compositions`` does not need numpy, and the weight table wraps the
+same pages as numpy arrays without copying. Exact fractions are only built
+when asked for.
+"""
+import bisect
+import datetime
+import functools
+import hashlib
+import json
+import mmap
+import os
+import struct
+from fractions import Fraction
+from pathlib import Path
+
+import kanilog
+
+from .timeline import (
+    CSV_PATH,
+    DATA_PATH,
+    INITIAL_CSV_PATH,
+    CompositionTimeline,
+    _stat_signature,
+    csv_lock,
+    get_source_signature,
+    replace_file,
+)
+
+logger = kanilog.get_module_logger(__file__, 1)
+
+STORE_PATH = DATA_PATH / "n225.bin"
+STORE_MAGIC = b"N225STOR"
+STORE_VERSION = 2
+_PREFIX = struct.Struct("<8sII")
+_ALIGNMENT = 64
+_EPOCH = datetime.date(1970, 1, 1)
+# memoryview formats of the stored dtypes.
+_FORMATS = {"<i4": "i", "<f8": "d"}
+
+
+def _source_digests():
+    return {
+        path.name: hashlib.sha256(path.read_bytes()).hexdigest()
+        for path in (INITIAL_CSV_PATH, CSV_PATH)
+    }
+
+
+def _source_stats():
+    return {path.name: list(_stat_signature(path)) for path in (INITIAL_CSV_PATH, CSV_PATH)}
+
+
+def _read_sources():
+    """Contents of the CSVs with their stats, taken from the same open files."""
+    sources = {}
+    for path in (INITIAL_CSV_PATH, CSV_PATH):
+        with path.open("rb") as f:
+            stat = os.fstat(f.fileno())
+            sources[path.name] = (f.read(), [stat.st_ino, stat.st_size, stat.st_mtime_ns])
+    return sources
+
+
+def _align(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _count(shape):
+    return functools.reduce(lambda x, y: x * y, shape, 1)
+
+
+def compile_store(path=STORE_PATH):
+    """Write the timeline of the current CSVs to ``path``.
+
+    The CSVs are read once under ``csv_lock``, so the stats and digests in
+    the header are those of the bytes the timeline was built from.
+    """
+    import numpy as np
+
+    from .weights import WeightTable
+
+    with csv_lock():
+        sources = _read_sources()
+    timeline = CompositionTimeline(
+        init_csv_text=sources[INITIAL_CSV_PATH.name][0].decode(),
+        csv_text=sources[CSV_PATH.name][0].decode(),
+    )
+    table = WeightTable.from_timeline(timeline)
+    minashi_texts = {}
+    minashi_text = np.full((len(table.dates), len(table.stock_codes)), -1, dtype="<i4")
+    for i, snapshot in enumerate(timeline.snapshots):
+        for stock_code, text in snapshot["stocks"].items():
+            minashi_text[i, table.code_index[stock_code]] = minashi_texts.setdefault(
+                text, len(minashi_texts)
+            )
+    arrays = {
+        "dates": np.array([(date - _EPOCH).days for date in table.dates], dtype="<i4"),
+        "josuu": np.asarray(table.josuu, dtype="<f8"),
+        "minashi": np.asarray(table.minashi, dtype="<f8"),
+        "minashi_text": minashi_text,
+    }
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+    header = json.dumps(
+        {
+            "stock_codes": table.stock_codes,
+            "minashi_texts": list(minashi_texts),
+            "josuu_texts": [snapshot["josuu_text"] for snapshot in timeline.snapshots],
+            "sources": {
+                "stats": {name: stat for name, (_, stat) in sources.items()},
+                "digests": {
+                    name: hashlib.sha256(content).hexdigest()
+                    for name, (content, _) in sources.items()
+                },
+            },
+            "arrays": layout,
+        }
+    ).encode("utf-8")
+    data_start = _align(_PREFIX.size + len(header))
+
+    def write(f):
+        f.write(_PREFIX.pack(STORE_MAGIC, STORE_VERSION, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+
+    replace_file(path, write, "wb")
+    logger.info("Compiled %s", path)
+    return path
+
+
+class CompositionStore(object):
+    """Read-only view of a compiled store.
+
+    ``get_josuu`` and ``get_minashi`` return numpy arrays over the mapped
+    pages. ``get_compositions`` and ``get_all_stock_codes`` answer like
+    ``CompositionTimeline``.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = Path(path)
+        with self.path.open("rb") as f:
+            prefix = f.read(_PREFIX.size)
+            if len(prefix) != _PREFIX.size:
+                raise ValueError(f"{self.path} is truncated.")
+            magic, version, header_length = _PREFIX.unpack(prefix)
+            if magic != STORE_MAGIC:
+                raise ValueError(f"{self.path} is not a composition store.")
+            if version != STORE_VERSION:
+                raise ValueError(f"{self.path} has store version {version}, not {STORE_VERSION}.")
+            header = json.loads(f.read(header_length).decode("utf-8"))
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data_start = _align(_PREFIX.size + header_length)
+        self._layout = header["arrays"]
+
+        self.stock_codes = header["stock_codes"]
+        self.minashi_texts = header["minashi_texts"]
+        self.josuu_texts = header["josuu_texts"]
+        self.sources = header["sources"]
+        self.dates = [_EPOCH + datetime.timedelta(days=days) for days in self._view("dates")]
+        self._stocks = [None] * len(self.dates)
+
+    def _view(self, name):
+        spec = self._layout[name]
+        start = self._data_start + spec["offset"]
+        end = start + _count(spec["shape"]) * int(spec["dtype"][2:])
+        return memoryview(self._mmap)[start:end].cast(_FORMATS[spec["dtype"]])
+
+    def _array(self, name):
+        import numpy as np
+
+        spec = self._layout[name]
+        return np.frombuffer(
+            self._mmap,
+            dtype=np.dtype(spec["dtype"]),
+            count=_count(spec["shape"]),
+            offset=self._data_start + spec["offset"],
+        ).reshape(spec["shape"])
+
+    def get_josuu(self):
+        return self._array("josuu")
+
+    def get_minashi(self):
+        return self._array("minashi")
+
+    def is_fresh(self):
+        """Whether the CSVs are those compiled, by stat and else by content."""
+        if self.sources["stats"] == _source_stats():
+            return True
+        return self.sources["digests"] == _source_digests()
+
+    def index_of(self, date):
+        if date < self.dates[0]:
+            raise NotImplementedError(f"Not implemnted n225 list before {self.dates[0]}")
+        return bisect.bisect_right(self.dates, date) - 1
+
+    def _get_stocks(self, period):
+        stocks = self._stocks[period]
+        if stocks is None:
+            count = len(self.stock_codes)
+            row = self._view("minashi_text")[period * count : (period + 1) * count].tolist()
+            stocks = self._stocks[period] = {
+                stock_code: self.minashi_texts[text]
+                for stock_code, text in zip(self.stock_codes, row)
+                if text >= 0
+            }
+        return stocks
+
+    def get_compositions(self, date):
+        period = self.index_of(date)
+        return {"stocks": dict(self._get_stocks(period)), "josuu": float(self.josuu_texts[period])}
+
+    def get_all_stock_codes(self):
+        return set(self.stock_codes)
+
+    def get_fractions(self):
+        fractions = {text: Fraction(text) for text in self.minashi_texts}
+        return [
+            {
+                stock_code: fractions[text]
+                for stock_code, text in self._get_stocks(period).items()
+            }
+            for period in range(len(self.dates))
+        ]
+
+    def get_josuu_fractions(self):
+        return [Fraction(text) for text in self.josuu_texts]
+
+
+def load_store(path=STORE_PATH):
+    """Return the store at ``path``, or ``None`` if it is missing or stale."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        composition_store = CompositionStore(path)
+    except (ValueError, KeyError) as e:
+        logger.warning("Ignoring composition store: %s", e)
+        return None
+    if not composition_store.is_fresh():
+        logger.info("Composition store %s is older than the CSVs.", path)
+        return None
+    return composition_store
+
+
+@functools.lru_cache(maxsize=1)
+def _get_store(signature):
+    return load_store()
+
+
+def get_store():
+    """The store of the current CSVs, ``None`` if it is missing or stale."""
+    return _get_store(get_source_signature())
+
+
+def clear_cache():
+    _get_store.cache_clear()
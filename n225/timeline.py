@@ -0,0 +1,246 @@
+"""Composition timeline built once from data/initial_n225.csv and data/n225.csv.
+
+data/n225.csv is only ever replaced by an atomic rename, so readers never
+lock and never see a partial file. Writers serialize on ``csv_lock`` and bump
+the generation in data/n225.generation. Cached timelines are checked against
+the stat of the CSVs at most every ``RELOAD_CHECK_INTERVAL`` seconds and
+rebuilt when they changed.
+"""
+import bisect
+import contextlib
+import csv
+import datetime
+import os
+import tempfile
+import threading
+import time
+from fractions import Fraction
+from pathlib import Path
+
+DATA_PATH = Path(__file__).parent / "data"
+INITIAL_CSV_PATH = DATA_PATH / "initial_n225.csv"
+CSV_PATH = DATA_PATH / "n225.csv"
+LOCK_PATH = DATA_PATH / "n225.csv.lock"
+GENERATION_PATH = DATA_PATH / "n225.generation"
+CONSTITUENT_COUNT = 225
+RELOAD_CHECK_INTERVAL = 1.0
+
+
+def normalize_code(code):
+    code = str(code).strip()
+    # parse_pdfs can write codes read by tabula as floats, e.g. "2768.0".
+    if code.endswith(".0"):
+        code = code[:-2]
+    return code
+
+
+def _parse_date(text):
+    return datetime.datetime.strptime(text.strip(), "%Y-%m-%d").date()
+
+
+class CompositionTimeline(object):
+    """Date sorted composition snapshots, one per change date.
+
+    ``dates[i]`` is the first date on which ``snapshots[i]`` is effective, so a
+    lookup is a binary search over ``dates``. ``init_csv_text`` and
+    ``csv_text`` are the contents of the CSVs when already read.
+    """
+
+    def __init__(
+        self, init_csv_path=INITIAL_CSV_PATH, csv_path=CSV_PATH, init_csv_text=None, csv_text=None
+    ):
+        self.init_csv_path = Path(init_csv_path)
+        self.csv_path = Path(csv_path)
+        self.from_date = None
+        self.dates = []
+        self.snapshots = []
+        self.changes = []
+        self._all_stock_codes = None
+        if init_csv_text is None:
+            init_csv_text = self.init_csv_path.read_text()
+        if csv_text is None:
+            csv_text = self.csv_path.read_text()
+        self._load(init_csv_text, csv_text)
+
+    def _load(self, init_csv_text, csv_text):
+        csv_obj = csv.reader(init_csv_text.splitlines())
+        self.from_date = _parse_date(next(csv_obj)[1])
+        josuu = next(csv_obj)[1].strip()
+        next(csv_obj)
+        stocks = {}
+        for row in csv_obj:
+            stocks[normalize_code(row[0])] = row[1].strip()
+        self._append_snapshot(self.from_date, josuu, stocks)
+
+        csv_obj = csv.reader(csv_text.splitlines())
+        next(csv_obj)
+        for row in csv_obj:
+            change = (
+                _parse_date(row[0]),
+                normalize_code(row[1]),
+                normalize_code(row[2]),
+                row[3].strip(),
+                row[4].strip(),
+            )
+            self.changes.append(change)
+        self.changes.sort(key=lambda change: change[0])
+
+        for mod_date, remove_stock, add_stock, minashi, josuu in self.changes:
+            if mod_date != self.dates[-1]:
+                stocks = dict(stocks)
+                self._append_snapshot(mod_date, josuu, stocks)
+            del stocks[remove_stock]
+            stocks[add_stock] = minashi
+            del self.snapshots[-1]["minashi"][remove_stock]
+            self.snapshots[-1]["minashi"][add_stock] = Fraction(minashi)
+            self.snapshots[-1]["josuu_text"] = josuu
+            self.snapshots[-1]["josuu"] = float(josuu)
+
+        for date, snapshot in zip(self.dates, self.snapshots):
+            assert len(snapshot["stocks"]) == CONSTITUENT_COUNT, f"{date} has {len(snapshot['stocks'])} stocks."
+
+    def _append_snapshot(self, date, josuu, stocks):
+        if self.snapshots:
+            minashi = dict(self.snapshots[-1]["minashi"])
+        else:
+            minashi = {stock_code: Fraction(value) for stock_code, value in stocks.items()}
+        self.dates.append(date)
+        self.snapshots.append(
+            {"josuu": float(josuu), "josuu_text": josuu, "stocks": stocks, "minashi": minashi}
+        )
+
+    def index_of(self, date):
+        if date < self.from_date:
+            raise NotImplementedError(f"Not implemnted n225 list before {self.from_date}")
+        return bisect.bisect_right(self.dates, date) - 1
+
+    def snapshot(self, date):
+        return self.snapshots[self.index_of(date)]
+
+    def get_compositions(self, date):
+        snapshot = self.snapshot(date)
+        return {"stocks": dict(snapshot["stocks"]), "josuu": snapshot["josuu"]}
+
+    def get_all_stock_codes(self):
+        if self._all_stock_codes is None:
+            stock_codes = set(self.snapshots[0]["stocks"])
+            stock_codes.update(change[2] for change in self.changes)
+            self._all_stock_codes = frozenset(stock_codes)
+        return set(self._all_stock_codes)
+
+    def get_fractions(self):
+        return [snapshot["minashi"] for snapshot in self.snapshots]
+
+    def get_josuu_fractions(self):
+        return [Fraction(snapshot["josuu_text"]) for snapshot in self.snapshots]
+
+
+_signature = None
+_checked_at = None
+_timeline = None
+_timeline_lock = threading.Lock()
+
+
+def _stat_signature(path):
+    stat = path.stat()
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def get_source_signature():
+    """Stat signature of the CSVs, refreshed at most every ``RELOAD_CHECK_INTERVAL``."""
+    global _signature, _checked_at
+    now = time.monotonic()
+    if _checked_at is None or now - _checked_at >= RELOAD_CHECK_INTERVAL:
+        _signature = (_stat_signature(INITIAL_CSV_PATH), _stat_signature(CSV_PATH))
+        _checked_at = now
+    return _signature
+
+
+def get_timeline():
+    """The timeline of the current CSVs, rebuilt after they were replaced."""
+    global _timeline
+    signature = get_source_signature()
+    timeline = _timeline
+    if timeline is None or timeline.signature != signature:
+        with _timeline_lock:
+            if _timeline is None or _timeline.signature != signature:
+                timeline = CompositionTimeline(INITIAL_CSV_PATH, CSV_PATH)
+                timeline.signature = signature
+                _timeline = timeline
+            timeline = _timeline
+    return timeline
+
+
+def clear_cache():
+    global _timeline, _checked_at
+    _timeline = None
+    _checked_at = None
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Exclusive lock of the file ``path`` between processes, blocking until held."""
+    with open(path, "a") as f:
+        try:
+            import fcntl
+        except ImportError:
+            # Windows locks a byte range instead.
+            import msvcrt
+
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def csv_lock():
+    """Exclusive lock of the writers of data/n225.csv. Readers never take it."""
+    return file_lock(LOCK_PATH)
+
+
+def get_generation():
+    """Number of times data/n225.csv was regenerated, 0 if never."""
+    try:
+        return int(GENERATION_PATH.read_text())
+    except FileNotFoundError:
+        return 0
+
+
+def replace_file(path, write, mode="w"):
+    """Write ``path`` atomically.
+
+    ``write`` is called with a hidden temporary file in the same directory,
+    opened with ``mode``, that then replaces ``path`` by a rename. The
+    temporary file is removed if ``write`` fails.
+    """
+    path = Path(path)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, mode, newline=None if "b" in mode else "") as f:
+            write(f)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def replace_csv(write):
+    """Regenerate data/n225.csv and return its new generation.
+
+    ``write`` is called with a text file in the data directory that then
+    atomically replaces the CSV. Call it while holding ``csv_lock``.
+    """
+    replace_file(CSV_PATH, write)
+    generation = get_generation() + 1
+    replace_file(GENERATION_PATH, lambda f: f.write(f"{generation}\n"))
+    return generation
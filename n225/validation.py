@@ -0,0 +1,87 @@
+"""Comparison of a reconstructed index against the official daily close."""
+import numpy as np
+import pandas as pd
+
+from .weights import get_weight_table
+
+OFFICIAL_CLOSE_COLUMN = "終値"
+FLAGGED_RUN_COLUMNS = [
+    "run_start",
+    "run_end",
+    "days",
+    "change_date",
+    "max_error",
+    "implied_josuu",
+]
+
+
+def _to_daily(series):
+    index = series.index
+    if getattr(index, "tz", None) is not None:
+        index = index.tz_localize(None)
+    return series.groupby(pd.DatetimeIndex(index).normalize()).last()
+
+
+def compare_with_official(calculated, official=None, tolerance=0.01):
+    """Compare ``calculated`` with the official close on every common date.
+
+    ``calculated`` is a series of index values, or a frame of contributions
+    from ``calculate_n225_contributions`` that is summed per row. Intraday
+    rows are reduced to the last value of each day. ``official`` defaults to
+    the close of ``get_daily_n225_data_from_nikkei``.
+
+    Dates whose absolute error exceeds ``tolerance`` are ``flagged``.
+    ``run_start`` is the first date of the consecutive flagged run a date
+    belongs to and ``change_date`` the last known composition change. A run
+    starting after ``change_date`` points to a change missing from the CSVs
+    on ``run_start``, one starting on it to a wrong minashi or josuu there.
+    ``implied_josuu`` is the josuu that would reproduce the official close.
+    """
+    if isinstance(calculated, pd.DataFrame):
+        calculated = calculated.sum(axis=1)
+    if official is None:
+        from . import get_daily_n225_data_from_nikkei
+
+        official = get_daily_n225_data_from_nikkei()
+    if isinstance(official, pd.DataFrame):
+        official = official[OFFICIAL_CLOSE_COLUMN]
+    calculated = _to_daily(calculated)
+    official = _to_daily(pd.to_numeric(official))
+    report = pd.DataFrame({"calculated": calculated, "official": official}).dropna()
+    report.index.name = "Date"
+
+    table = get_weight_table()
+    periods = table.periods_of(report.index)
+    report["error"] = report["calculated"] - report["official"]
+    report["relative_error"] = report["error"] / report["official"]
+    report["implied_josuu"] = (
+        np.asarray(table.josuu)[periods] * report["calculated"] / report["official"]
+    )
+    flagged = (report["error"].abs() > tolerance).to_numpy()
+    report["flagged"] = flagged
+
+    starts = flagged & ~np.concatenate([[False], flagged[:-1]])
+    run_ids = np.cumsum(starts)
+    run_starts = report.index[starts]
+    report["run_start"] = pd.NaT
+    report.loc[flagged, "run_start"] = run_starts[run_ids[flagged] - 1]
+    report["change_date"] = pd.DatetimeIndex(table.dates)[periods]
+    return report
+
+
+def get_flagged_runs(report):
+    """One row per consecutive run of flagged dates in a comparison report."""
+    flagged = report[report["flagged"]]
+    if flagged.empty:
+        return pd.DataFrame(columns=FLAGGED_RUN_COLUMNS)
+    runs = flagged.assign(abs_error=flagged["error"].abs()).groupby("run_start")
+    result = pd.DataFrame(
+        {
+            "run_end": runs.apply(lambda run: run.index[-1]),
+            "days": runs.size(),
+            "change_date": runs["change_date"].first(),
+            "max_error": runs["abs_error"].max(),
+            "implied_josuu": runs["implied_josuu"].median(),
+        }
+    )
+    return result.reset_index()[FLAGGED_RUN_COLUMNS]
@@ -0,0 +1,89 @@
+"""Numeric minashi and weight table aligned to a fixed stock code order."""
+import functools
+
+import numpy as np
+
+from . import store
+from .index import IndexDefinition
+from .timeline import CONSTITUENT_COUNT, get_timeline
+
+
+class WeightTable(IndexDefinition):
+    """The n225 as a price weighted ``IndexDefinition`` with its exact values.
+
+    Rows follow ``timeline.dates`` and columns follow ``stock_codes``. Stocks
+    that are not a member in a period have ``nan`` minashi and zero weight.
+    ``fractions`` and ``josuu_fractions`` keep the exact values of every
+    period and are only built on first use. Build one with ``from_timeline``
+    or ``from_store``.
+    """
+
+    @classmethod
+    def _from_minashi(cls, dates, stock_codes, minashi, josuu, source):
+        table = cls.price_weighted(
+            "n225", dates, stock_codes, minashi, josuu, constituent_count=CONSTITUENT_COUNT
+        )
+        table.minashi = minashi
+        table.josuu = table.divisors
+        table._source = source
+        table._fractions = None
+        table._josuu_fractions = None
+        return table
+
+    @classmethod
+    def from_timeline(cls, timeline):
+        """Table of the snapshots of a ``CompositionTimeline``."""
+        stock_codes = sorted(timeline.get_all_stock_codes())
+        code_index = {code: i for i, code in enumerate(stock_codes)}
+        minashi = np.full((len(timeline.dates), len(stock_codes)), np.nan)
+        for i, snapshot in enumerate(timeline.snapshots):
+            for stock_code, value in snapshot["minashi"].items():
+                minashi[i, code_index[stock_code]] = float(value)
+        josuu = [snapshot["josuu"] for snapshot in timeline.snapshots]
+        return cls._from_minashi(timeline.dates, stock_codes, minashi, josuu, timeline)
+
+    @classmethod
+    def from_store(cls, composition_store):
+        """Table of the memory-mapped minashi and josuu of a ``CompositionStore``."""
+        return cls._from_minashi(
+            composition_store.dates,
+            composition_store.stock_codes,
+            composition_store.get_minashi(),
+            composition_store.get_josuu(),
+            composition_store,
+        )
+
+    @property
+    def fractions(self):
+        if self._fractions is None:
+            self._fractions = self._source.get_fractions()
+        return self._fractions
+
+    @property
+    def josuu_fractions(self):
+        if self._josuu_fractions is None:
+            self._josuu_fractions = self._source.get_josuu_fractions()
+        return self._josuu_fractions
+
+
+@functools.lru_cache(maxsize=1)
+def _get_weight_table(timeline):
+    return WeightTable.from_timeline(timeline)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_stored_weight_table(composition_store):
+    return WeightTable.from_store(composition_store)
+
+
+def get_weight_table():
+    """Weight table from the compiled store if it is fresh, else from the CSVs."""
+    composition_store = store.get_store()
+    if composition_store is None:
+        return _get_weight_table(get_timeline())
+    return _get_stored_weight_table(composition_store)
+
+
+def clear_cache():
+    _get_stored_weight_table.cache_clear()
+    _get_weight_table.cache_clear()
@@ -39,10 +39,11 @@ setup(
     description="Get compositions and josuu.",
     long_description=read("README.rst"),
     packages=find_packages(exclude=("tests",)),
-    package_data={'n225': ['data/n225.csv', 'data/initial_n225.csv']},
+    package_data={'n225': ['data/n225.csv', 'data/initial_n225.csv', 'data/n225.bin']},
     install_requires=get_requires(),
     extras_require={
         "test":  ["add_parent_path", "loglevel", "pytest", "stdlogging", "PyYAML"],
+        "export": ["pyarrow"],
     },
     classifiers=[
         "Development Status :: 2 - Pre-Alpha",
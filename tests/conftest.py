@@ -0,0 +1,40 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import numpy as np
+import pandas as pd
+import pytest
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    import n225
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: wall clock and memory benchmarks")
+
+
+@pytest.fixture
+def make_prices():
+    """Random prices of every stock code, and of ``extra_codes``, keyed by code."""
+
+    def make(seed=0, extra_codes=()):
+        rng = np.random.default_rng(seed)
+        stock_codes = sorted(n225.get_all_stock_codes()) + list(extra_codes)
+        return dict(zip(stock_codes, rng.uniform(100, 10000, len(stock_codes))))
+
+    return make
+
+
+@pytest.fixture
+def make_price_df():
+    """Random prices of every stock code for each timestamp of ``index``."""
+
+    def make(index, seed=0):
+        rng = np.random.default_rng(seed)
+        stock_codes = sorted(n225.get_all_stock_codes())
+        prices = rng.uniform(100, 10000, size=(len(index), len(stock_codes)))
+        return pd.DataFrame(prices, index=index, columns=stock_codes)
+
+    return make
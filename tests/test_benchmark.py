@@ -0,0 +1,186 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+"""Offline benchmarks of the hot paths.
+
+Each case records its best wall time and its peak traced memory, and fails
+when either exceeds ``N225_BENCHMARK_TOLERANCE`` times the value stored in
+``benchmarks.json``. They are not part of the default run. Run them with
+``N225_BENCHMARK=1``, and with ``N225_BENCHMARK_UPDATE=1`` to rewrite the
+baseline after an intended change.
+"""
+
+import datetime
+import json
+import os
+import shutil
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    import n225
+    from n225 import jpx
+    from n225.parse import ChangeRecord, parse_pdf_files
+
+BASELINE_PATH = Path(__file__).parent / "benchmarks.json"
+FIXTURE_PATH = Path(__file__).parent / "fixtures/newsroom"
+TOLERANCE = float(os.environ.get("N225_BENCHMARK_TOLERANCE", "3.0"))
+UPDATE = os.environ.get("N225_BENCHMARK_UPDATE") == "1"
+RUN = UPDATE or os.environ.get("N225_BENCHMARK") == "1"
+# Absolute slack so that sub-millisecond cases do not fail on timer noise.
+SECONDS_SLACK = 0.005
+PEAK_BYTES_SLACK = 1 << 20
+
+pytestmark = [
+    pytest.mark.benchmark,
+    pytest.mark.skipif(not RUN, reason="Set N225_BENCHMARK=1 to run the benchmarks."),
+]
+
+
+def measure(func, repeat):
+    func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(times), "peak_bytes": peak_bytes}
+
+
+def load_baseline():
+    return json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+
+
+@pytest.fixture(scope="module")
+def benchmark():
+    baseline = load_baseline()
+    results = {}
+
+    def run(name, func, repeat=5):
+        result = results[name] = measure(func, repeat)
+        if UPDATE:
+            return result
+        expected = baseline.get(name)
+        assert expected is not None, f"No baseline of {name}, record it with N225_BENCHMARK_UPDATE=1."
+        assert result["seconds"] <= expected["seconds"] * TOLERANCE + SECONDS_SLACK, (
+            name,
+            result,
+            expected,
+        )
+        assert result["peak_bytes"] <= expected["peak_bytes"] * TOLERANCE + PEAK_BYTES_SLACK, (
+            name,
+            result,
+            expected,
+        )
+        return result
+
+    yield run
+    if UPDATE:
+        baseline.update(results)
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=1, sort_keys=True) + "\n")
+
+
+def _dates(from_date, to_date):
+    return [
+        from_date + datetime.timedelta(days=i) for i in range((to_date - from_date).days + 1)
+    ]
+
+
+def test_get_compositions(benchmark):
+    dates = _dates(datetime.date(2019, 7, 1), datetime.date(2024, 12, 31))
+    benchmark("get_compositions", lambda: [n225.get_compositions(date) for date in dates])
+
+    def load():
+        n225.clear_compositions_cache()
+        n225.get_compositions(dates[-1])
+
+    benchmark("load_timeline", load)
+
+
+def test_calculate_n225_price(benchmark):
+    stock_codes = sorted(n225.get_all_stock_codes())
+    rng = np.random.default_rng(0)
+    dates = _dates(datetime.date(2019, 7, 1), datetime.date(2024, 12, 31))[::7]
+    panel = [
+        dict(zip(stock_codes, row))
+        for row in rng.uniform(100, 10000, (len(dates), len(stock_codes)))
+    ]
+    benchmark(
+        "calculate_n225_price",
+        lambda: [n225.calculate_n225_price(date, prices) for date, prices in zip(dates, panel)],
+    )
+    benchmark(
+        "calculate_n225_price_exact",
+        lambda: [
+            n225.calculate_n225_price(date, prices, exact=True)
+            for date, prices in zip(dates[:20], panel)
+        ],
+    )
+
+    index = pd.date_range("2019-07-01", "2024-12-31", freq="2h")
+    price_df = pd.DataFrame(
+        rng.uniform(100, 10000, (len(index), len(stock_codes))), index=index, columns=stock_codes
+    )
+    benchmark("calculate_n225_series", lambda: n225.calculate_n225_series(price_df), repeat=3)
+
+
+def test_get_business_days(benchmark):
+    benchmark("get_business_days", lambda: jpx.get_business_days("2000-01-01", "2024-12-31"))
+
+
+def test_get_stock_zaraba_filter(benchmark):
+    index = pd.date_range("2023-01-01", periods=1_000_000, freq="min", tz="Asia/Tokyo")
+    series = pd.Series(np.zeros(len(index)), index=index)
+    benchmark(
+        "get_stock_zaraba_filter",
+        lambda: jpx.get_stock_zaraba_filter("2023-01-01", "2024-12-31", series),
+        repeat=3,
+    )
+
+
+def test_get_futures_sq_dates(benchmark):
+    benchmark(
+        "get_futures_sq_dates",
+        lambda: n225.get_futures_sq_dates(datetime.date(2030, 1, 1)),
+    )
+
+
+def test_download_from_fixtures(benchmark, tmp_path):
+    def download():
+        shutil.rmtree(tmp_path / "kousei", ignore_errors=True)
+        n225.download_kouseimeigara_pdfs(tmp_path / "kousei", fixture_path=FIXTURE_PATH)
+
+    benchmark("download_from_fixtures", download, repeat=3)
+
+
+def test_parse_pdf_files(benchmark, tmp_path):
+    pytest.importorskip("pdftotext")
+    pytest.importorskip("tabula")
+    n225.download_kouseimeigara_pdfs(tmp_path / "kousei", fixture_path=FIXTURE_PATH)
+    # A generated announcement in the layout of the real ones with made-up
+    # codes. The other fixtures are empty placeholders.
+    pdf_files = sorted((tmp_path / "kousei").glob("*_日経平均株価等の構成銘柄の取り扱いについて.pdf"))
+    assert parse_pdf_files(pdf_files, max_workers=1) == [
+        [ChangeRecord(datetime.date(2021, 9, 1), "9999", "9998", "50", None, pdf_files[0].name)]
+    ]
+    # Needs poppler and Java, so the baseline is recorded on a host that has them.
+    if not UPDATE and "parse_pdf_files" not in load_baseline():
+        pytest.skip("No baseline of parse_pdf_files, record it with N225_BENCHMARK_UPDATE=1.")
+
+    def parse():
+        shutil.rmtree(tmp_path / "cache", ignore_errors=True)
+        parse_pdf_files(pdf_files, tmp_path / "cache", max_workers=1)
+
+    benchmark("parse_pdf_files", parse, repeat=3)
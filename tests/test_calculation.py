@@ -0,0 +1,51 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import datetime
+from decimal import Decimal
+from fractions import Fraction
+
+import pandas as pd
+import pytest
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    import n225
+    from n225.weights import get_weight_table
+
+
+def test_calculate_n225_series(make_price_df):
+    index = pd.date_range("2019-09-30 09:00", "2019-10-01 15:00", freq="3h")
+    price_df = make_price_df(index)
+    series = n225.calculate_n225_series(price_df)
+    assert list(series.index) == list(index)
+    for timestamp, row in price_df.iterrows():
+        expected = n225.calculate_n225_price(timestamp.date(), row.to_dict())
+        assert series[timestamp] == pytest.approx(expected)
+
+
+def test_calculate_n225_series_missing_price(make_price_df):
+    price_df = make_price_df(pd.date_range("2020-01-06", periods=2))
+    with pytest.raises(KeyError):
+        n225.calculate_n225_series(price_df.drop(columns=["7203"]))
+
+
+def test_calculate_n225_price_exact():
+    date = datetime.date(2019, 10, 1)
+    stock_price_dict = {stock_code: 1234.5 for stock_code in n225.get_all_stock_codes()}
+    stock_price_dict["2413"] = 6543.2
+    price = n225.calculate_n225_price(date, stock_price_dict)
+    exact_price = n225.calculate_n225_price(date, stock_price_dict, exact=True)
+    assert isinstance(exact_price, Decimal)
+    assert exact_price == Decimal(str(round(price, 2)))
+    assert exact_price.as_tuple().exponent == -2
+
+
+def test_weight_table():
+    table = get_weight_table()
+    period = table.period_of(datetime.date(2021, 10, 1))
+    column = table.code_index["6762"]
+    assert table.fractions[period]["6762"] == Fraction(50, 3)
+    assert table.weights[period, column] == pytest.approx(3 / 27.769)
+    assert table.members[period].sum() == 225
@@ -0,0 +1,164 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import json
+import time
+from pathlib import Path
+
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    import n225
+    from n225.download import (
+        DownloadManifest,
+        Fetcher,
+        FixtureResponse,
+        FixtureSession,
+        RateLimiter,
+        download_listing_pdfs,
+    )
+
+FIXTURE_PATH = Path(__file__).parent / "fixtures/newsroom"
+LISTING_URL = "https://indexes.nikkei.co.jp/nkave/newsroom?evt=10016&idxtag=00001&page={page}"
+
+
+class RecordingSession(FixtureSession):
+    def __init__(self, fixture_path):
+        super().__init__(fixture_path)
+        self.urls = []
+
+    def get(self, url, *args, **kwargs):
+        self.urls.append(str(url))
+        return super().get(url, *args, **kwargs)
+
+
+def test_download_from_fixtures(tmp_path):
+    pdf_path = tmp_path / "kousei"
+    downloaded = n225.download_kouseimeigara_pdfs(pdf_path, fixture_path=FIXTURE_PATH)
+    assert downloaded == 3
+    assert sorted(f.name for f in pdf_path.glob("*.pdf")) == [
+        "2020-09-07_日経平均株価の銘柄定期入れ替え等について.pdf",
+        "2021-08-10_日経平均株価等の構成銘柄の取り扱いについて.pdf",
+        "2021-09-06_日経平均株価の銘柄定期入れ替えについて.pdf",
+    ]
+    entries = json.loads((tmp_path / "manifest.json").read_text())
+    entry = entries["https://indexes.nikkei.co.jp/nkave/pdf/news/20210906.pdf"]
+    assert entry["file"] == "2021-09-06_日経平均株価の銘柄定期入れ替えについて.pdf"
+    assert len(entry["sha256"]) == 64
+
+
+def test_download_stops_at_known_entry(tmp_path):
+    manifest = DownloadManifest(tmp_path / "manifest.json")
+    fetcher = Fetcher(RecordingSession(FIXTURE_PATH), rate=None)
+    assert download_listing_pdfs(fetcher, LISTING_URL, "銘柄", tmp_path, manifest) == 3
+
+    session = RecordingSession(FIXTURE_PATH)
+    manifest = DownloadManifest(tmp_path / "manifest.json")
+    fetcher = Fetcher(session, rate=None)
+    assert download_listing_pdfs(fetcher, LISTING_URL, "銘柄", tmp_path, manifest) == 0
+    assert session.urls == [LISTING_URL.format(page=1)]
+
+    (tmp_path / "2020-09-07_日経平均株価の銘柄定期入れ替え等について.pdf").unlink()
+    session = RecordingSession(FIXTURE_PATH)
+    fetcher = Fetcher(session, rate=None)
+    downloaded = download_listing_pdfs(
+        fetcher, LISTING_URL, "銘柄", tmp_path, manifest, stop_at_known=False
+    )
+    assert downloaded == 1
+    assert session.urls[-1] == LISTING_URL.format(page=3)
+
+
+class FlakySession(object):
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def get(self, url, *args, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            return FixtureResponse(url, b"", 503)
+        return FixtureResponse(url, b"ok")
+
+
+def test_fetcher_retry():
+    session = FlakySession(2)
+    fetcher = Fetcher(session, rate=None, retries=3, backoff=0)
+    assert fetcher.get("https://example.com/a.pdf").content == b"ok"
+    assert session.calls == 3
+
+    fetcher = Fetcher(FlakySession(5), rate=None, retries=1, backoff=0)
+    assert fetcher.get("https://example.com/a.pdf").status_code == 503
+
+
+def test_rate_limiter():
+    rate_limiter = RateLimiter(50, burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        rate_limiter.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+class FailingOnceSession(RecordingSession):
+    def __init__(self, fixture_path, fail_url):
+        super().__init__(fixture_path)
+        self.fail_url = fail_url
+
+    def get(self, url, *args, **kwargs):
+        if str(url) == self.fail_url:
+            self.fail_url = None
+            self.urls.append(str(url))
+            return FixtureResponse(str(url), b"", 500)
+        return super().get(url, *args, **kwargs)
+
+
+def test_download_retries_failed_pdf(tmp_path):
+    failed_url = "https://indexes.nikkei.co.jp/nkave/pdf/news/20210810.pdf"
+    manifest = DownloadManifest(tmp_path / "manifest.json")
+    fetcher = Fetcher(FailingOnceSession(FIXTURE_PATH, failed_url), rate=None, retries=0)
+    assert download_listing_pdfs(fetcher, LISTING_URL, "銘柄", tmp_path, manifest) == 2
+    entry = DownloadManifest(tmp_path / "manifest.json").get(failed_url)
+    assert entry["pending"] and entry["listing"] == LISTING_URL
+    assert manifest.get(LISTING_URL.format(page=1))["etag"] is None
+
+    session = RecordingSession(FIXTURE_PATH)
+    manifest = DownloadManifest(tmp_path / "manifest.json")
+    fetcher = Fetcher(session, rate=None)
+    assert download_listing_pdfs(fetcher, LISTING_URL, "銘柄", tmp_path, manifest) == 1
+    assert session.urls[0] == failed_url
+    assert "pending" not in manifest.get(failed_url)
+    assert (tmp_path / "2021-08-10_日経平均株価等の構成銘柄の取り扱いについて.pdf").exists()
+
+    session = RecordingSession(FIXTURE_PATH)
+    fetcher = Fetcher(session, rate=None)
+    assert download_listing_pdfs(fetcher, LISTING_URL, "銘柄", tmp_path, manifest) == 0
+    assert session.urls == [LISTING_URL.format(page=1)]
+
+
+class LockCheckingSession(FixtureSession):
+    def __init__(self, fixture_path, lock_path):
+        super().__init__(fixture_path)
+        self.lock_path = lock_path
+        self.locked = []
+
+    def get(self, url, *args, **kwargs):
+        import fcntl
+
+        with open(self.lock_path, "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self.locked.append(True)
+            else:
+                fcntl.flock(f, fcntl.LOCK_UN)
+                self.locked.append(False)
+        return super().get(url, *args, **kwargs)
+
+
+def test_download_holds_manifest_lock(tmp_path):
+    pdf_path = tmp_path / "kousei"
+    session = LockCheckingSession(FIXTURE_PATH, tmp_path / "manifest.json.lock")
+    fetcher = Fetcher(session, rate=None)
+    assert n225.download_kouseimeigara_pdfs(pdf_path, fetcher=fetcher) == 3
+    assert session.locked and all(session.locked)
+    assert not list(pdf_path.glob(".*"))
@@ -0,0 +1,40 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import datetime
+import math
+
+import pytest
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    import n225
+
+
+def test_engine_ticks(make_prices):
+    date = datetime.date(2021, 1, 4)
+    engine = n225.N225Engine(date)
+    prices = make_prices(0)
+    for stock_code, price in list(prices.items())[:-1]:
+        engine.on_tick(stock_code, price)
+    assert math.isnan(engine.value)
+    stock_code, price = list(prices.items())[-1]
+    assert engine.on_tick(stock_code, price) == pytest.approx(n225.calculate_n225_price(date, prices))
+
+    prices["7203"] = 7000.0
+    prices["9984"] = 9000.0
+    engine.on_ticks(["7203", "9984", 7203], [6000.0, 9000.0, 7000.0])
+    assert engine.value == pytest.approx(n225.calculate_n225_price(date, prices))
+
+
+def test_engine_rollover(make_prices):
+    prices = make_prices(1)
+    engine = n225.N225Engine(datetime.date(2019, 9, 30), prices)
+    assert engine.value == pytest.approx(n225.calculate_n225_price(datetime.date(2019, 9, 30), prices))
+    assert engine.next_change_date == datetime.date(2019, 10, 1)
+
+    prices["2413"] = 5000.0
+    engine.on_tick("2413", 5000.0, datetime.datetime(2019, 10, 1, 9))
+    assert engine.date == datetime.date(2019, 10, 1)
+    assert engine.value == pytest.approx(n225.calculate_n225_price(datetime.date(2019, 10, 1), prices))
@@ -0,0 +1,57 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import datetime
+
+import pytest
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    import n225
+    from n225 import __main__ as n225_main
+    from n225.export import get_last_exported_date
+
+
+def test_daily_compositions():
+    compositions = n225.get_daily_compositions("2019-09-27", "2019-10-02")
+    assert compositions.groupby("date").size().tolist() == [225] * 4
+    day = compositions[compositions["date"] == "2019-10-01"].set_index("code")
+    expected = n225.get_compositions(datetime.date(2019, 10, 1))
+    assert set(day.index) == set(expected["stocks"])
+    assert day.loc["2413", "minashi"] == pytest.approx(125 / 6)
+    assert (day["josuu"] == expected["josuu"]).all()
+    assert day.loc["2413", "weight"] == pytest.approx(50 / (125 / 6) / expected["josuu"])
+    assert n225.get_daily_compositions("2019-10-05", "2019-10-06").empty
+
+
+def test_last_exported_date(tmp_path):
+    assert get_last_exported_date(tmp_path) is None
+    (tmp_path / "n225_20190701_20211230.parquet").touch()
+    (tmp_path / "n225_20220103_20220105.parquet").touch()
+    (tmp_path / ".n225_partial").touch()
+    assert get_last_exported_date(tmp_path) == datetime.date(2022, 1, 5)
+
+
+def test_export_daily_compositions(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = n225.export_daily_compositions(tmp_path, datetime.date(2021, 12, 31))
+    assert path.name == "n225_20190701_20211230.parquet"
+    path = n225.export_daily_compositions(tmp_path, datetime.date(2022, 1, 5))
+    assert path.name == "n225_20220104_20220105.parquet"
+    assert n225.export_daily_compositions(tmp_path, datetime.date(2022, 1, 5)) is None
+    table = pq.read_table(tmp_path)
+    assert table.num_rows == len(n225.get_daily_compositions(None, "2022-01-05"))
+    assert table.column_names == ["date", "code", "minashi", "weight", "josuu"]
+
+    n225.export_daily_compositions(tmp_path, datetime.date(2022, 1, 5), full=True)
+    assert [part.name for part in tmp_path.glob("n225_*")] == ["n225_20190701_20220105.parquet"]
+
+
+def test_export_args(tmp_path):
+    args = n225_main.parse_args(["export", str(tmp_path), "--to", "2022-01-05", "--format", "arrow"])
+    assert args.command == "export"
+    assert args.to_date == datetime.date(2022, 1, 5)
+    assert args.file_format == "arrow"
+    assert not args.full
+    assert n225_main.parse_args([]).command is None
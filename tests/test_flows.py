@@ -0,0 +1,53 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    import n225
+
+
+def _weight(date, stock_code):
+    compositions = n225.get_compositions(date)
+    if stock_code not in compositions["stocks"]:
+        return 0.0
+    return 50 / float(compositions["stocks"][stock_code]) / compositions["josuu"]
+
+
+def test_rebalance_flows():
+    flows = n225.get_rebalance_flows()
+    events = n225.get_composition_events()
+    for _, event in events.iterrows():
+        rows = flows[(flows["date"] == event["date"]) & (flows["code"] == event["code"])]
+        assert len(rows) == 1
+    change = flows[flows["date"] == "2021-10-01"].set_index("code")
+    before = datetime.date(2021, 9, 30)
+    after = datetime.date(2021, 10, 1)
+    for stock_code in ["3105", "5901", "6861", "6981"]:
+        assert change.loc[stock_code, "weight_before"] == pytest.approx(_weight(before, stock_code))
+        assert change.loc[stock_code, "weight_after"] == pytest.approx(_weight(after, stock_code))
+    assert change.loc["3105", "weight_after"] == 0
+    assert "shares" not in flows
+
+
+def test_rebalance_flows_notional(make_price_df):
+    price_df = make_price_df(pd.bdate_range("2019-07-01", "2024-12-31"))
+    flows = n225.get_rebalance_flows(1e12, price_df)
+    change = flows[flows["date"] == "2021-10-01"].set_index("code")
+    price_date = pd.Timestamp("2021-09-30")
+    index_value = n225.calculate_n225_price(price_date.date(), price_df.loc[price_date].to_dict())
+    shares = 1e12 / index_value * change.loc["6861", "weight_delta"]
+    assert change.loc["6861", "shares"] == pytest.approx(shares)
+    assert change.loc["6861", "notional"] == pytest.approx(shares * price_df.loc[price_date, "6861"])
+    assert change.loc["3105", "notional"] < 0
+
+    aum = pd.Series(1e12, index=pd.DatetimeIndex(sorted(set(flows["date"]))))
+    aum.iloc[0] = np.nan
+    flows = n225.get_rebalance_flows(aum, price_df.drop(columns=["7203"]))
+    assert flows["shares"].isna().all()
@@ -0,0 +1,51 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# Wall time budget for a cold ``import n225`` in a fresh interpreter.
+IMPORT_TIME_BUDGET = 0.3
+HEAVY_MODULES = [
+    "numpy",
+    "pandas",
+    "pdftotext",
+    "tabula",
+    "kanirequests",
+    "mojimoji",
+    "urlpath",
+    "dateutil",
+]
+
+SCRIPT = """
+import json
+import sys
+import time
+
+start = time.perf_counter()
+import n225
+import n225.jpx
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def _import_n225():
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=Path(__file__).parents[1],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(result.stdout)
+
+
+def test_import_budget():
+    results = [_import_n225() for _ in range(3)]
+    loaded = set(results[0]["modules"])
+    assert [module for module in HEAVY_MODULES if module in loaded] == []
+    assert min(result["elapsed"] for result in results) < IMPORT_TIME_BUDGET
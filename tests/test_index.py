@@ -0,0 +1,68 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    import n225
+    from n225.index import IndexDefinition
+    from n225.weights import get_weight_table
+
+
+def _sub_indices():
+    table = get_weight_table()
+    dates = [datetime.date(2019, 7, 1), datetime.date(2020, 10, 1)]
+    stock_codes = table.member_codes(0)[:5]
+    minashi = np.array([[1.0, 2.0, 0.5, 1.0, np.nan], [1.0, 2.0, 0.5, np.nan, 10.0]])
+    price_weighted = IndexDefinition.price_weighted(
+        "sub", dates, stock_codes, minashi, [4.0, 5.0], constituent_count=4
+    )
+    shares = np.array([[1e6, 2e6, np.nan, 3e6, 4e6]] * 2)
+    cap_weighted = IndexDefinition.cap_weighted("cap", dates, stock_codes, shares, [1e5, 2e5])
+    return price_weighted, cap_weighted
+
+
+def test_index_definition():
+    price_weighted, cap_weighted = _sub_indices()
+    assert isinstance(get_weight_table(), IndexDefinition)
+    assert get_weight_table().name == "n225"
+    assert get_weight_table().constituent_count == 225
+    assert get_weight_table().josuu is get_weight_table().divisors
+    assert price_weighted.period_of(datetime.date(2020, 10, 1)) == 1
+    assert price_weighted.member_codes(1) == [price_weighted.stock_codes[i] for i in (0, 1, 2, 4)]
+    with pytest.raises(ValueError):
+        IndexDefinition.price_weighted(
+            "sub",
+            price_weighted.dates,
+            price_weighted.stock_codes,
+            np.ones((2, 5)),
+            [1.0, 1.0],
+            constituent_count=4,
+        )
+    with pytest.raises(NotImplementedError):
+        price_weighted.period_of(datetime.date(2019, 6, 28))
+
+
+def test_calculate_indices(make_price_df):
+    price_weighted, cap_weighted = _sub_indices()
+    price_df = make_price_df(pd.date_range("2020-09-28", "2020-10-05", freq="6h"))
+    values = n225.calculate_indices(price_df, [get_weight_table(), price_weighted, cap_weighted])
+    assert list(values.columns) == ["n225", "sub", "cap"]
+    np.testing.assert_allclose(values["n225"], n225.calculate_n225_series(price_df))
+    for timestamp, row in values.iloc[::3].iterrows():
+        prices = price_df.loc[timestamp, price_weighted.stock_codes].to_numpy()
+        period = 0 if timestamp < pd.Timestamp("2020-10-01") else 1
+        minashi = [[1.0, 2.0, 0.5, 1.0, np.nan], [1.0, 2.0, 0.5, np.nan, 10.0]][period]
+        expected = np.nansum(prices * 50 / np.array(minashi)) / [4.0, 5.0][period]
+        assert row["sub"] == pytest.approx(expected)
+        expected = np.nansum(prices * np.array([1e6, 2e6, np.nan, 3e6, 4e6])) / [1e5, 2e5][period]
+        assert row["cap"] == pytest.approx(expected)
+
+    with pytest.raises(KeyError):
+        n225.calculate_indices(price_df.drop(columns=price_weighted.stock_codes[:1]), [cap_weighted])
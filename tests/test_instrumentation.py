@@ -0,0 +1,85 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import json
+from pathlib import Path
+
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    import n225
+    from n225 import __main__ as n225_main
+    from n225 import instrumentation
+    from n225.parse import iter_change_records, parse_pdf_files
+
+FIXTURE_PATH = Path(__file__).parent / "fixtures/newsroom"
+
+
+def test_run_report(tmp_path):
+    report = instrumentation.RunReport()
+    with report.stage("download"):
+        report.count("pages_fetched")
+        report.count("bytes_downloaded", 100)
+    report.record_file("parse", "a.pdf", 0.5, status="parsed")
+    report.write_json(tmp_path / "report.json")
+    result = json.loads((tmp_path / "report.json").read_text())
+    assert result["counters"] == {"pages_fetched": 1, "bytes_downloaded": 100}
+    assert set(result["stages"]) == {"download"}
+    assert result["files"] == [
+        {"stage": "parse", "name": "a.pdf", "seconds": 0.5, "status": "parsed"}
+    ]
+
+    report.write_prometheus(tmp_path / "n225.prom")
+    lines = (tmp_path / "n225.prom").read_text().splitlines()
+    assert 'n225_stage_seconds{stage="download"}' in "\n".join(lines)
+    assert "n225_bytes_downloaded 100" in lines
+
+
+def test_pipeline_counters(tmp_path):
+    report = instrumentation.start_run()
+    n225.download_kouseimeigara_pdfs(tmp_path / "kousei", fixture_path=FIXTURE_PATH)
+    assert report.counters["pages_fetched"] == 2
+    assert report.counters["pdfs_downloaded"] == 3
+    assert report.counters["bytes_downloaded"] > 0
+    assert len([entry for entry in report.files if entry["stage"] == "fetch"]) == 6
+
+    pdf_file = tmp_path / "2021-01-01_unknown.pdf"
+    pdf_file.write_bytes(b"%PDF-1.4")
+    outcome = {}
+    assert list(iter_change_records(pdf_file, outcome)) == []
+    assert outcome == {"branch": None, "status": "skipped", "error": None}
+    parse_pdf_files([pdf_file], tmp_path / "cache", max_workers=1)
+    parse_pdf_files([pdf_file], tmp_path / "cache", max_workers=1)
+    assert report.counters["pdfs_skipped"] == 1
+    assert report.counters["pdfs_cached"] == 1
+    assert report.files[-1]["name"] == pdf_file.name
+
+
+def test_main_report(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        n225_main,
+        "STAGES",
+        [
+            ("first", lambda: calls.append(1)),
+            ("second", lambda: instrumentation.count("pdfs_parsed")),
+        ],
+    )
+    args = n225_main.parse_args(
+        [
+            "--report",
+            str(tmp_path / "report.json"),
+            "--prometheus",
+            str(tmp_path / "n225.prom"),
+            "--profile",
+            str(tmp_path / "n225.prof"),
+        ]
+    )
+    n225_main.main(args)
+    assert calls == [1]
+    result = json.loads((tmp_path / "report.json").read_text())
+    assert list(result["stages"]) == ["first", "second"]
+    assert result["counters"] == {"pdfs_parsed": 1}
+    assert "n225_pdfs_parsed 1" in (tmp_path / "n225.prom").read_text()
+    assert (tmp_path / "n225.prof").exists()
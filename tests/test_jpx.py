@@ -0,0 +1,122 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    from n225 import jpx
+
+
+def test_trading_calendar():
+    calendar = jpx.TradingCalendar(2020, 2020)
+    assert not calendar.is_open(datetime.date(2020, 10, 1))
+    assert calendar.next(datetime.date(2020, 12, 30)) == datetime.date(2021, 1, 4)
+    assert calendar.next(datetime.date(2020, 12, 30), 5) == datetime.date(2021, 1, 8)
+    assert calendar.previous(datetime.date(2020, 1, 6), 3) == datetime.date(2019, 12, 26)
+    assert calendar.count(datetime.date(2020, 1, 1), datetime.date(2020, 12, 31)) == 242
+    assert calendar.range(datetime.date(2020, 9, 30), datetime.date(2020, 10, 5)) == [
+        datetime.date(2020, 9, 30),
+        datetime.date(2020, 10, 2),
+        datetime.date(2020, 10, 5),
+    ]
+    dates = np.array(["2021-01-01", "2021-01-04", "2020-10-01"], dtype="datetime64[D]")
+    assert list(calendar.is_open_array(dates)) == [False, True, False]
+
+
+def test_trading_calendar_extension_is_thread_safe():
+    expected_calendar = jpx.TradingCalendar(2022, 2025)
+    dates = [datetime.date(2022, 1, 10) + datetime.timedelta(days=31 * i) for i in range(36)]
+    expected = [(expected_calendar.previous(date), expected_calendar.next(date)) for date in dates]
+    # Readers race the backward extensions of the range.
+    calendar = jpx.TradingCalendar(2025, 2025)
+
+    def shift(date):
+        return calendar.previous(date), calendar.next(date)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert list(executor.map(shift, reversed(dates)))[::-1] == expected
+
+
+def test_trading_calendar_builds_years_lazily():
+    calendar = jpx.TradingCalendar(2020, 2021)
+    assert calendar.is_open(datetime.date(1990, 5, 1))
+    assert calendar.next(datetime.date(2020, 12, 30)) == datetime.date(2021, 1, 4)
+    assert sorted(calendar._year_open_days) == [1990, 2020, 2021]
+
+    counts = calendar.count_array(np.array(["2021-01-04"], dtype="datetime64[D]"))
+    assert calendar.previous(datetime.date(2019, 1, 4)) == datetime.date(2018, 12, 28)
+    assert list(calendar.count_array(np.array(["2021-01-04"], dtype="datetime64[D]"))) == list(
+        counts
+    )
+    assert calendar.days[0] == np.datetime64("2018-01-04")
+    assert sorted(calendar._year_open_days) == [1990, 2018, 2019, 2020, 2021]
+
+
+def test_set_calendar_range():
+    try:
+        jpx.set_calendar_range(2020, 2020)
+        assert jpx.get_calendar().days[0] == np.datetime64("2020-01-06")
+        assert len(jpx.get_calendar().days) == 242
+    finally:
+        jpx.set_calendar_range()
+    assert jpx.get_calendar().from_year == 2000
+
+
+def test_business_date_wrappers():
+    assert jpx.get_next_business_date(datetime.date(2020, 9, 30)) == datetime.date(2020, 10, 2)
+    assert jpx.get_last_business_date(datetime.date(2021, 1, 4)) == datetime.date(2020, 12, 30)
+    next_dt = jpx.get_next_business_date(datetime.datetime(2020, 12, 30, 10))
+    assert next_dt == datetime.datetime(2021, 1, 4, 10)
+    assert len(jpx.get_business_days("2020-01-01", "2020-12-31")) == 242
+
+
+def test_stock_zaraba_filter():
+    index = pd.date_range("2020-09-30", "2020-10-02 23:59", freq="1min")
+    series = pd.Series(np.arange(len(index)), index=index)
+    zaraba_filter = jpx.get_stock_zaraba_filter("2020-09-30", "2020-10-02", series)
+    zaraba = series[zaraba_filter]
+    assert len(zaraba) == 2 * 300
+    assert zaraba.index[0] == pd.Timestamp("2020-09-30 09:00")
+    assert zaraba.index[-1] == pd.Timestamp("2020-10-02 14:59")
+    assert not zaraba_filter[index == pd.Timestamp("2020-09-30 11:30")].any()
+
+    index = pd.date_range("2024-11-05", periods=24 * 60, freq="1min")
+    zaraba = jpx.filter_stock_zaraba("2024-11-01", "2024-11-30", pd.Series(0, index=index))
+    assert zaraba.index[-1] == pd.Timestamp("2024-11-05 15:29")
+
+
+def test_night_session_filter():
+    index = pd.date_range("2024-11-08 12:00", "2024-11-11 12:00", freq="1h")
+    night_filter = jpx.get_session_filter(index, jpx.FUTURES_NIGHT_SESSIONS)
+    assert list(index[night_filter].strftime("%d %H")) == [
+        "08 17", "08 18", "08 19", "08 20", "08 21", "08 22", "08 23",
+        "09 00", "09 01", "09 02", "09 03", "09 04", "09 05",
+    ]
+
+
+def test_shinagashi_calendar():
+    # Friday trades settle on Tuesday and pay for Tuesday to Wednesday.
+    assert jpx.get_shinagashi_nissu(datetime.date(2020, 9, 25)) == 1
+    # Settlement on 2020-09-30 is returned after the 2020-10-01 outage.
+    assert jpx.get_shinagashi_nissu(datetime.date(2020, 9, 28)) == 2
+    # Settlement before the year end holidays.
+    assert jpx.get_shinagashi_nissu(datetime.date(2020, 12, 28)) == 5
+
+    trade_dates = pd.date_range("2019-12-01", "2021-01-31")
+    calendar = jpx.get_shinagashi_calendar(trade_dates)
+    assert list(calendar.index) == list(trade_dates)
+    for trade_date, row in calendar.iloc[::5].iterrows():
+        settlement_date = jpx.get_next_business_date(trade_date.date(), 2)
+        assert row["settlement_date"].date() == settlement_date
+        assert row["return_date"].date() == jpx.get_next_business_date(settlement_date)
+        assert row["settlement_offset"] == (settlement_date - trade_date.date()).days
+        assert row["shinagashi_nissu"] == jpx.get_shinagashi_nissu(trade_date.date())
+
+    shifted = jpx.get_calendar().shift_array(np.array(["2000-01-05"], dtype="datetime64[D]"), -5)
+    assert shifted[0] == np.datetime64("1999-12-27")
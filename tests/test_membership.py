@@ -0,0 +1,31 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import pandas as pd
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    import n225
+
+
+def test_membership_matrix():
+    membership = n225.get_membership_matrix("2019-09-27", "2019-10-02")
+    assert list(membership.index) == list(pd.to_datetime(["2019-09-27", "2019-09-30", "2019-10-01", "2019-10-02"]))
+    assert (membership.sum(axis=1) == 225).all()
+    assert list(membership["9681"]) == [True, True, False, False]
+    assert list(membership["2413"]) == [False, False, True, True]
+    for day in membership.index:
+        stocks = n225.get_compositions(day.date())["stocks"]
+        assert set(membership.columns[membership.loc[day].to_numpy()]) == set(stocks)
+    assert n225.get_member_days("2413", "2019-09-27", "2019-10-02")[0] == pd.Timestamp("2019-10-01")
+
+
+def test_composition_events():
+    events = n225.get_composition_events()
+    assert list(events.columns) == ["date", "code", "event", "minashi_before", "minashi_after"]
+    event = events[(events["date"] == "2019-10-01") & (events["event"] == "add")].iloc[0]
+    assert event["code"] == "2413"
+    assert event["minashi_after"] == 125 / 6
+    splits = events[events["event"] == "minashi"]
+    assert set(splits["code"]) == {"4568", "5703", "8411", "2768", "6762", "7203"}
@@ -0,0 +1,79 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    import n225
+    from n225 import nikkei
+    from n225.download import Fetcher, FixtureSession
+
+FIXTURE_PATH = Path(__file__).parent / "fixtures/nikkei"
+
+
+class CountingSession(FixtureSession):
+    def __init__(self, fixture_path):
+        super().__init__(fixture_path)
+        self.count = 0
+
+    def get(self, url, *args, **kwargs):
+        self.count += 1
+        return super().get(url, *args, **kwargs)
+
+
+def test_daily_data_cache(tmp_path):
+    cache_path = tmp_path / "daily.npz"
+    with pytest.raises(FileNotFoundError):
+        n225.get_daily_n225_data_from_nikkei(cache_path, offline=True)
+
+    daily_df = n225.get_daily_n225_data_from_nikkei(cache_path, fixture_path=FIXTURE_PATH / "old")
+    assert list(daily_df.columns) == ["終値", "始値", "高値", "安値"]
+    assert list(daily_df.index) == [pd.Timestamp("2024-01-04"), pd.Timestamp("2024-01-05")]
+    assert daily_df.loc["2024-01-05", "終値"] == 33377.42
+    assert daily_df.index.name == "データ日付"
+
+    fresh_df = n225.get_daily_n225_data_from_nikkei(cache_path, fixture_path=FIXTURE_PATH / "new")
+    pd.testing.assert_frame_equal(fresh_df, daily_df)
+    offline_df = n225.get_daily_n225_data_from_nikkei(cache_path, ttl=0, offline=True)
+    pd.testing.assert_frame_equal(offline_df, daily_df)
+
+    # Known rows are kept as cached and only later rows are appended.
+    cache = nikkei.DailyDataCache(cache_path)
+    data = cache.load()
+    data["values"][0, 0] = -1.0
+    cache.save(data)
+    daily_df = n225.get_daily_n225_data_from_nikkei(cache_path, 0, fixture_path=FIXTURE_PATH / "new")
+    assert len(daily_df) == 4
+    assert daily_df.iloc[0, 0] == -1.0
+    assert daily_df.loc["2024-01-10", "安値"] == 33872.16
+
+
+def test_daily_data_refreshed_once(tmp_path):
+    session = CountingSession(FIXTURE_PATH / "new")
+    fetcher = Fetcher(session, rate=None, retries=0)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        frames = list(
+            executor.map(
+                lambda _: nikkei.load_daily_data(tmp_path / "daily.npz", fetcher=fetcher), range(8)
+            )
+        )
+    assert session.count == 1
+    for daily_df in frames:
+        assert np.array_equal(daily_df.to_numpy(), frames[0].to_numpy())
+
+
+def test_parse_daily_csv():
+    csv_path = FIXTURE_PATH / "new" / "nkave_historical_nikkei_stock_average_daily_jp.csv.html"
+    text = csv_path.read_bytes().decode("ms932")
+    columns, dates, values = nikkei.parse_daily_csv(text, after=datetime.date(2024, 1, 5))
+    assert columns == ["終値", "始値", "高値", "安値"]
+    assert list(dates.astype(str)) == ["2024-01-09", "2024-01-10"]
+    assert values.shape == (2, 4)
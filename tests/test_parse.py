@@ -0,0 +1,100 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import datetime
+
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    from n225 import parse
+    from n225.parse import (
+        ChangeRecord,
+        JosuuRecord,
+        ParseCache,
+        build_change_df,
+        parse_pdf_files,
+    )
+
+
+def test_parse_cache(tmp_path):
+    pdf_file = tmp_path / "2021-09-06_日経平均株価の銘柄定期入れ替えについて.pdf"
+    pdf_file.write_bytes(b"%PDF-1.4 fixture")
+    cache = ParseCache(tmp_path / "cache")
+    key = cache.key(pdf_file)
+    records = [ChangeRecord(datetime.date(2021, 10, 1), "3105", "6861", "0.1", None, pdf_file.name)]
+    cache.put(key, records)
+    assert cache.get(key) == records
+    assert parse_pdf_files([pdf_file], tmp_path / "cache", max_workers=1) == [records]
+
+    pdf_file.write_bytes(b"%PDF-1.4 changed")
+    assert cache.key(pdf_file) != key
+    assert cache.get(cache.key(pdf_file)) is None
+
+
+def test_parse_pdf_files_caches_misses(tmp_path, monkeypatch):
+    pdf_files = [tmp_path / "2021-01-01_a.pdf", tmp_path / "2021-01-02_b.pdf"]
+    for pdf_file in pdf_files:
+        pdf_file.write_bytes(pdf_file.name.encode("utf-8"))
+    assert parse_pdf_files(pdf_files, tmp_path / "cache", max_workers=1) == [[], []]
+
+    def fail(pdf_file):
+        raise AssertionError("parsed again")
+
+    monkeypatch.setattr(parse, "parse_pdf_with_outcome", fail)
+    assert parse_pdf_files(pdf_files, tmp_path / "cache", max_workers=1) == [[], []]
+
+
+def test_build_change_df():
+    change_records = [
+        ChangeRecord(datetime.date(2020, 10, 2), "4272", "9434", "50", None, "b.pdf"),
+        ChangeRecord(datetime.date(2020, 9, 29), "4568", "4568", "50/3", None, "a.pdf"),
+        ChangeRecord(datetime.date(2020, 9, 29), "5703", "5703", "500", None, "a.pdf"),
+        ChangeRecord(datetime.date(2020, 7, 29), "8729", "8697", "50", None, "c.pdf"),
+    ]
+    josuu_records = [
+        JosuuRecord(datetime.date(2020, 7, 29), "27.859", "2020-07-28_x.pdf"),
+        JosuuRecord(datetime.date(2020, 10, 2), "27.870", "2020-10-01_x.pdf"),
+    ]
+    change_df = build_change_df(change_records, josuu_records)
+    assert list(change_df.columns) == ["Remove", "Add", "Minashi", "Josuu"]
+    assert change_df.index.name == "Date"
+    assert list(change_df.index) == [
+        datetime.date(2020, 7, 29),
+        datetime.date(2020, 9, 29),
+        datetime.date(2020, 9, 29),
+        datetime.date(2020, 10, 2),
+    ]
+    assert list(change_df["Remove"]) == ["8729", "4568", "5703", "4272"]
+    assert list(change_df["Josuu"]) == ["27.859", "27.859", "27.859", "27.870"]
+
+
+def test_parse_pdf_files_does_not_cache_failures(tmp_path, monkeypatch):
+    pdf_file = tmp_path / "2021-09-06_日経平均株価の銘柄定期入れ替えについて.pdf"
+    pdf_file.write_bytes(b"%PDF-1.4 fixture")
+
+    def fail(pdf_file):
+        return [], dict(branch="periodic_review", status="failed", error="JVM", seconds=0.0)
+
+    monkeypatch.setattr(parse, "parse_pdf_with_outcome", fail)
+    cache = ParseCache(tmp_path / "cache")
+    assert parse_pdf_files([pdf_file], cache.path, max_workers=1) == [[]]
+    assert cache.get(cache.key(pdf_file)) is None
+
+
+def test_parse_pdf_files_caches_unexpected_layout(tmp_path, monkeypatch):
+    pdf_file = tmp_path / "2021-09-06_日経平均株価の銘柄定期入れ替えについて.pdf"
+    pdf_file.write_bytes(b"%PDF-1.4 fixture")
+    calls = []
+
+    def mismatch(pdf_file):
+        calls.append(pdf_file)
+        outcome = dict(branch="periodic_review", status="failed", seconds=0.0)
+        return [], dict(outcome, error=parse.UNEXPECTED_LAYOUT)
+
+    monkeypatch.setattr(parse, "parse_pdf_with_outcome", mismatch)
+    cache = ParseCache(tmp_path / "cache")
+    assert parse_pdf_files([pdf_file], cache.path, max_workers=1) == [[]]
+    assert cache.get(cache.key(pdf_file)) == []
+    assert parse_pdf_files([pdf_file], cache.path, max_workers=1) == [[]]
+    assert len(calls) == 1
@@ -0,0 +1,32 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import datetime
+
+import numpy as np
+import pandas as pd
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    import n225
+
+
+def test_histories():
+    josuu = n225.get_josuu_history()
+    assert josuu.index[0] == pd.Timestamp("2019-07-01")
+    assert josuu["2019-10-01"] == 27.760
+    minashi = n225.get_minashi_history()
+    assert minashi.loc["2019-10-01", "2413"] == 125 / 6
+    assert np.isnan(minashi.loc["2019-10-01", "9681"])
+
+
+def test_asof_matches_compositions():
+    index = pd.date_range("2019-09-29", "2020-12-05", freq="7h")
+    josuu = n225.get_josuu_asof(index)
+    minashi = n225.get_minashi_asof(index, ["2413", "8697"])
+    for timestamp in index[::37]:
+        compositions = n225.get_compositions(timestamp.date())
+        assert josuu[timestamp] == compositions["josuu"]
+        assert ("8697" in compositions["stocks"]) == (not np.isnan(minashi.loc[timestamp, "8697"]))
+    assert n225.get_josuu_asof(pd.Index([datetime.date(2020, 1, 6)])).iloc[0] == 27.760
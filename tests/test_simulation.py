@@ -0,0 +1,81 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import datetime
+
+import numpy as np
+import pytest
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    import n225
+    from n225.simulation import Change
+
+DATE = datetime.date(2021, 9, 30)
+
+
+def test_simulate_changes(make_prices):
+    prices = make_prices(extra_codes=["1301"])
+    index_value = n225.calculate_n225_price(DATE, prices)
+    changes = [Change("3105", "6861", "0.1"), Change(5901, 6981, 0.8)]
+    scenario = n225.simulate_changes(DATE, changes, prices)
+    assert scenario.weights["3105"] == 0
+    assert scenario.weights["6861"] == pytest.approx(50 / 0.1 / scenario.josuu)
+    # The index value is continuous across the changes.
+    new_value = sum(prices[code] * weight for code, weight in scenario.weights.items())
+    assert new_value == pytest.approx(index_value)
+    compositions = n225.get_compositions(DATE)
+    base_weight = 50 / float(compositions["stocks"]["7203"]) / compositions["josuu"]
+    assert scenario.weight_deltas["7203"] == pytest.approx(
+        base_weight * (compositions["josuu"] / scenario.josuu - 1)
+    )
+    assert scenario.weight_deltas["3105"] < 0
+
+
+def test_minashi_change(make_prices):
+    prices = make_prices(extra_codes=["1301"])
+    compositions = n225.get_compositions(DATE)
+    minashi = compositions["stocks"]["7203"]
+    scenario = n225.simulate_changes(DATE, [Change("7203", "7203", minashi)], prices)
+    assert scenario.josuu == pytest.approx(compositions["josuu"])
+    np.testing.assert_allclose(scenario.weight_deltas, 0, atol=1e-12)
+    scenario = n225.simulate_changes(DATE, [Change("7203", "7203", float(minashi) / 5)], prices)
+    assert scenario.josuu > compositions["josuu"]
+
+
+def test_simulate_scenarios(make_prices):
+    prices = make_prices(extra_codes=["1301"])
+    scenarios = [[Change("3105", add, "1")] for add in ("6861", "1301", "6981")]
+    scenarios.append([])
+    scenario_set = n225.simulate_scenarios(DATE, scenarios, prices)
+    assert len(scenario_set) == 4
+    assert scenario_set.stock_codes[-3:] == ["1301", "6861", "6981"]
+    values = scenario_set.weights @ np.array([prices[code] for code in scenario_set.stock_codes])
+    np.testing.assert_allclose(values, scenario_set.index_value)
+    assert scenario_set.josuu[3] == pytest.approx(scenario_set.josuu_before)
+    for i, changes in enumerate(scenarios):
+        scenario = n225.simulate_changes(DATE, changes, prices)
+        assert scenario.josuu == pytest.approx(scenario_set.josuu[i])
+
+    with pytest.raises(ValueError):
+        n225.simulate_scenarios(DATE, [[Change("6861", "1301", "1")]], prices)
+    with pytest.raises(ValueError):
+        n225.simulate_scenarios(DATE, [[Change("3105", "7203", "1")]], prices)
+
+
+def test_fractional_minashi(make_prices):
+    prices = make_prices(extra_codes=["1301"])
+    scenario = n225.simulate_changes(DATE, [Change("7203", "7203", "50/3")], prices)
+    assert scenario.weights["7203"] == pytest.approx(3 / scenario.josuu)
+
+
+def test_chained_changes(make_prices):
+    prices = make_prices(extra_codes=["9998", "9999"])
+    changes = [Change("3105", "9999", "1"), Change("9999", "9998", "1")]
+    scenario_set = n225.simulate_scenarios(DATE, [changes], prices)
+    scenario = scenario_set.scenario(0)
+    assert scenario.weights["9999"] == 0
+    assert scenario.weights["3105"] == 0
+    assert scenario.weights["9998"] == pytest.approx(50 / scenario.josuu)
+    assert (scenario.weights > 0).sum() == 225
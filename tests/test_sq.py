@@ -0,0 +1,71 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import datetime
+
+import numpy as np
+import pandas as pd
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    import n225
+    from n225.jpx import get_calendar
+
+
+def test_sq_date():
+    assert n225.get_sq_date(2024, 3) == datetime.date(2024, 3, 8)
+    # National Foundation Day falls on the second Friday of February 2022.
+    assert n225.get_sq_date(2022, 2) == datetime.date(2022, 2, 10)
+
+
+def test_futures_sq_dates():
+    sq_dates = n225.get_futures_sq_dates(datetime.date(2021, 5, 1))
+    assert sq_dates[:4] == [
+        datetime.date(2020, 3, 13),
+        datetime.date(2020, 6, 12),
+        datetime.date(2020, 9, 11),
+        datetime.date(2020, 12, 11),
+    ]
+    assert len(sq_dates) == 12
+
+
+def test_next_sq_dates():
+    index = pd.date_range("2023-12-01", "2025-01-31", freq="5h", tz="Asia/Tokyo")
+    next_sq_dates = n225.get_next_sq_dates(index)
+    monthly = n225.get_next_sq_dates(index, monthly=True, inclusive=True)
+    calendar = n225.get_sq_calendar(2023, 2026)
+    for timestamp, sq_date, monthly_sq_date in list(zip(index, next_sq_dates, monthly))[::23]:
+        date = timestamp.date()
+        assert sq_date.item() == min(d for d in calendar.sq_dates() if d > date)
+        assert monthly_sq_date.item() == min(d for d in calendar.sq_dates(monthly=True) if d >= date)
+
+
+def test_days_to_sq():
+    index = pd.date_range("2024-01-01", "2024-06-13", freq="D")
+    days = n225.get_days_to_sq(index)
+    business_days = n225.get_days_to_sq(index, business_days=True)
+    calendar = get_calendar()
+    for date, n_days, n_business_days in list(zip(index.date, days, business_days))[::7]:
+        sq_date = n225.get_sq_date(2024, 3 if date < datetime.date(2024, 3, 8) else 6)
+        assert n_days == (sq_date - date).days
+        assert n_business_days == calendar.count(date, sq_date) - calendar.is_open(date)
+    assert n225.get_sq_calendar(2024, 2024).last_trading_days()[0] == datetime.date(2024, 3, 7)
+    assert np.isnat(n225.get_sq_calendar(2024, 2024).next_sq_dates([datetime.date(2024, 12, 31)])[0])
+
+
+def test_days_to_sq_past_range():
+    sq_calendar = n225.get_sq_calendar(2024, 2024)
+    days = pd.DatetimeIndex(["2024-12-12", "2024-12-20"])
+    nat = np.datetime64("NaT").astype("int64")
+    assert list(sq_calendar.days_to_sq(days)) == [1, nat]
+    assert list(sq_calendar.days_to_sq(days, business_days=True)) == [1, nat]
+    assert list(sq_calendar.days_to_sq(days[1:], monthly=True, business_days=True)) == [nat]
+
+
+def test_sq_calendar_grows():
+    assert n225.get_sq_calendar(2024, 2024).sq_dates()[-1] == datetime.date(2024, 12, 13)
+    wide = n225.get_sq_calendar(2020, 2026)
+    assert wide.sq_dates()[0] == datetime.date(2020, 3, 13)
+    assert n225.get_sq_calendar(2024, 2024).sq_dates() == wide.sq_dates()[16:20]
+    assert n225.get_next_sq_dates([datetime.date(1999, 1, 1)])[0] == np.datetime64("1999-03-12")
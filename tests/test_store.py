@@ -0,0 +1,69 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import contextlib
+import datetime
+import hashlib
+
+import numpy as np
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    import n225
+    from n225 import store
+    from n225.store import CompositionStore, compile_store, load_store
+    from n225.weights import WeightTable
+
+
+def test_compile_and_load_store(tmp_path):
+    timeline = n225.get_timeline()
+    table = WeightTable.from_timeline(timeline)
+    path = compile_store(tmp_path / "n225.bin")
+    composition_store = load_store(path)
+    stored_table = WeightTable.from_store(composition_store)
+    assert not stored_table.minashi.flags.writeable
+    assert stored_table._fractions is None
+    assert stored_table.dates == table.dates
+    assert stored_table.stock_codes == table.stock_codes
+    assert stored_table.fractions == table.fractions
+    assert stored_table.josuu_fractions == table.josuu_fractions
+    assert np.array_equal(stored_table.weights, table.weights)
+    assert np.array_equal(stored_table.members, table.members)
+
+    assert composition_store.get_all_stock_codes() == timeline.get_all_stock_codes()
+    for date in timeline.dates + [datetime.date(2024, 12, 30)]:
+        assert composition_store.get_compositions(date) == timeline.get_compositions(date)
+
+
+def test_compile_store_reads_under_lock(tmp_path, monkeypatch):
+    events = []
+
+    @contextlib.contextmanager
+    def lock():
+        events.append("lock")
+        yield
+        events.append("unlock")
+
+    read_sources = store._read_sources
+    monkeypatch.setattr(store, "csv_lock", lock)
+    monkeypatch.setattr(store, "_read_sources", lambda: events.append("read") or read_sources())
+    composition_store = CompositionStore(compile_store(tmp_path / "n225.bin"))
+    assert events == ["lock", "read", "unlock"]
+    assert composition_store.sources["stats"] == store._source_stats()
+    assert composition_store.sources["digests"]["n225.csv"] == hashlib.sha256(
+        store.CSV_PATH.read_bytes()
+    ).hexdigest()
+
+
+def test_stale_or_broken_store(tmp_path, monkeypatch):
+    path = compile_store(tmp_path / "n225.bin")
+    monkeypatch.setattr(store, "_source_stats", lambda: {"n225.csv": [0, 0, 0]})
+    assert CompositionStore(path).is_fresh()
+    monkeypatch.setattr(store, "_source_digests", lambda: {"n225.csv": "changed"})
+    assert not CompositionStore(path).is_fresh()
+    assert load_store(path) is None
+
+    path.write_bytes(b"not a store")
+    assert load_store(path) is None
+    assert load_store(tmp_path / "missing.bin") is None
@@ -0,0 +1,92 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import datetime
+import sys
+import types
+
+import pytest
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    import n225
+    from n225 import store, timeline
+    from n225.timeline import CompositionTimeline, get_timeline
+    from n225.weights import get_weight_table
+
+
+def test_timeline_lookup():
+    timeline = CompositionTimeline()
+    before = timeline.get_compositions(datetime.date(2019, 9, 30))
+    after = timeline.get_compositions(datetime.date(2019, 10, 1))
+    assert "9681" in before["stocks"] and "2413" not in before["stocks"]
+    assert "2413" in after["stocks"] and after["stocks"]["2413"] == "125/6"
+    assert after["josuu"] == 27.760
+    assert timeline.get_compositions(datetime.date(2021, 10, 1))["stocks"]["2768"] == "2500"
+    with pytest.raises(NotImplementedError):
+        timeline.get_compositions(datetime.date(2019, 6, 28))
+
+
+def test_timeline_cache():
+    timeline = get_timeline()
+    assert get_timeline() is timeline
+    compositions = n225.get_compositions(datetime.date(2020, 11, 10))
+    compositions["stocks"].clear()
+    assert len(n225.get_compositions(datetime.date(2020, 11, 10))["stocks"]) == 225
+    n225.clear_compositions_cache()
+    assert get_timeline() is not timeline
+
+
+def test_timeline_reload(tmp_path, monkeypatch):
+    csv_path = tmp_path / "n225.csv"
+    csv_path.write_bytes(timeline.CSV_PATH.read_bytes())
+    for module in (timeline, store):
+        monkeypatch.setattr(module, "CSV_PATH", csv_path)
+    monkeypatch.setattr(timeline, "LOCK_PATH", tmp_path / "n225.csv.lock")
+    monkeypatch.setattr(timeline, "GENERATION_PATH", tmp_path / "n225.generation")
+    monkeypatch.setattr(timeline, "RELOAD_CHECK_INTERVAL", 0)
+    n225.clear_compositions_cache()
+    try:
+        before = get_timeline()
+        assert get_timeline() is before
+        assert timeline.get_generation() == 0
+        text = csv_path.read_text() + "2022-04-04,7203,1301,50,28.024\n"
+        with timeline.csv_lock():
+            assert timeline.replace_csv(lambda f: f.write(text)) == 1
+        after = get_timeline()
+        assert after is not before
+        assert after.dates[-1] == datetime.date(2022, 4, 4)
+        assert get_weight_table().dates[-1] == datetime.date(2022, 4, 4)
+        assert timeline.get_generation() == 1
+        assert list(tmp_path.glob("n225.csv?*")) == [tmp_path / "n225.csv.lock"]
+    finally:
+        n225.clear_compositions_cache()
+
+
+def test_file_lock_without_fcntl(tmp_path, monkeypatch):
+    calls = []
+    msvcrt = types.SimpleNamespace(
+        LK_LOCK=1, LK_UNLCK=0, locking=lambda fd, mode, size: calls.append((mode, size))
+    )
+    monkeypatch.setitem(sys.modules, "fcntl", None)
+    monkeypatch.setitem(sys.modules, "msvcrt", msvcrt)
+    with timeline.file_lock(tmp_path / "lock"):
+        assert calls == [(1, 1)]
+    assert calls == [(1, 1), (0, 1)]
+
+
+def test_replace_file(tmp_path):
+    path = tmp_path / "n225.csv"
+    path.write_text("old")
+
+    def fail(f):
+        f.write("partial")
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        timeline.replace_file(path, fail)
+    assert path.read_text() == "old"
+    assert [child.name for child in tmp_path.iterdir()] == ["n225.csv"]
+    timeline.replace_file(path, lambda f: f.write(b"new"), "wb")
+    assert path.read_text() == "new"
@@ -0,0 +1,49 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# vim:fenc=utf-8
+
+import numpy as np
+import pandas as pd
+import pytest
+from add_parent_path import add_parent_path
+
+with add_parent_path():
+    import n225
+
+
+def test_contributions(make_price_df):
+    price_df = make_price_df(pd.bdate_range("2020-09-01", "2020-10-30"))
+    contributions = n225.calculate_n225_contributions(price_df)
+    series = n225.calculate_n225_series(price_df)
+    np.testing.assert_allclose(contributions.sum(axis=1), series)
+    for date, row in contributions.iloc[::9].iterrows():
+        compositions = n225.get_compositions(date.date())
+        members = compositions["stocks"]
+        assert set(row.index[row.to_numpy() != 0]) == set(members)
+        minashi = n225.get_minashi_asof(pd.DatetimeIndex([date])).iloc[0]
+        stock_code = sorted(members)[0]
+        assert row[stock_code] == pytest.approx(
+            price_df.loc[date, stock_code] * 50 / minashi[stock_code] / compositions["josuu"]
+        )
+
+
+def test_compare_with_official(make_price_df):
+    price_df = make_price_df(pd.bdate_range("2020-01-06", "2020-12-30"))
+    series = n225.calculate_n225_series(price_df)
+    official = series.round(2)
+    official["2020-06-15":"2020-06-19"] *= 1.01
+    report = n225.compare_with_official(series, official)
+    flagged = report.index[report["flagged"]]
+    assert list(flagged) == list(pd.bdate_range("2020-06-15", "2020-06-19"))
+    assert (report.loc[flagged, "run_start"] == pd.Timestamp("2020-06-15")).all()
+    josuu = n225.get_josuu_asof(flagged)
+    np.testing.assert_allclose(report.loc[flagged, "implied_josuu"], josuu / 1.01, rtol=1e-6)
+
+    runs = n225.get_flagged_runs(report)
+    assert len(runs) == 1
+    run = runs.iloc[0]
+    assert run["run_start"] == pd.Timestamp("2020-06-15")
+    assert run["run_end"] == pd.Timestamp("2020-06-19")
+    assert run["days"] == 5
+    assert run["change_date"] < run["run_start"]
+    assert n225.get_flagged_runs(n225.compare_with_official(series, official, 1e9)).empty